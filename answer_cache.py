@@ -0,0 +1,167 @@
+"""
+Semantic answer cache - skips the DeepSeek call for repeated questions
+
+An answer is reused when a new question retrieves exactly the same chunks
+(same ids and content) and its embedding is within ANSWER_CACHE_THRESHOLD
+cosine similarity of a cached question. Only questions without conversation
+history are cached, since follow-ups depend on what was said before.
+
+Entries expire after ANSWER_CACHE_TTL_HOURS, the least recently used are
+evicted past ANSWER_CACHE_SIZE, and everything is persisted in SQLite so the
+cache survives restarts. Forked bot workers share the table: before a lookup,
+a change in PRAGMA data_version (another connection committed) syncs the
+in-memory index with the rows other workers added or evicted.
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "answer_cache.sqlite3")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_HOURS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", "168"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1000"))
+
+def chunk_key(docs):
+    """Identity of a retrieval result: chunk ids plus a digest of their content"""
+    parts = []
+    for doc in docs:
+        digest = hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()[:12]
+        parts.append(f"{getattr(doc, 'id', None) or ''}:{digest}")
+    return "|".join(parts)
+
+class SemanticAnswerCache:
+    """In-memory index of cached answers, written through to SQLite"""
+
+    def __init__(self, path=ANSWER_CACHE_PATH, threshold=ANSWER_CACHE_THRESHOLD,
+                 ttl_hours=ANSWER_CACHE_TTL_HOURS, max_size=ANSWER_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl = ttl_hours * 3600
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = {}   # rowid -> [key, vector, answer, created_at, last_used]
+        self._by_key = {}    # chunk key -> set of rowids
+        self._data_version = None  # PRAGMA data_version the in-memory index matches
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS answers (
+            id INTEGER PRIMARY KEY,
+            chunk_key TEXT NOT NULL,
+            question TEXT NOT NULL,
+            vector BLOB NOT NULL,
+            answer TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )""")
+        self._db.commit()
+        self._load()
+
+    def _load(self):
+        cutoff = time.time() - self.ttl
+        self._db.execute("DELETE FROM answers WHERE created_at < ?", (cutoff,))
+        self._db.commit()
+        self._sync()
+
+    def _sync(self):
+        """Add rows other processes stored, forget rows they evicted"""
+        (self._data_version,) = self._db.execute("PRAGMA data_version").fetchone()
+        stored = {rowid for (rowid,) in self._db.execute("SELECT id FROM answers")}
+        for rowid in [rowid for rowid in self._entries if rowid not in stored]:
+            self._drop(rowid, delete=False)
+        new_ids = stored.difference(self._entries)
+        if not new_ids:
+            return
+        rows = self._db.execute(
+            f"SELECT id, chunk_key, vector, answer, created_at, last_used FROM answers WHERE id IN ({','.join('?' * len(new_ids))})",
+            tuple(new_ids),
+        )
+        for rowid, key, blob, answer, created_at, last_used in rows:
+            vector = np.frombuffer(blob, dtype=np.float32)
+            self._entries[rowid] = [key, vector, answer, created_at, last_used]
+            self._by_key.setdefault(key, set()).add(rowid)
+
+    def _refresh(self):
+        (data_version,) = self._db.execute("PRAGMA data_version").fetchone()
+        if data_version != self._data_version:
+            self._sync()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, rowid, delete=True):
+        key = self._entries.pop(rowid)[0]
+        rowids = self._by_key.get(key)
+        if rowids is not None:
+            rowids.discard(rowid)
+            if not rowids:
+                del self._by_key[key]
+        if delete:
+            self._db.execute("DELETE FROM answers WHERE id = ?", (rowid,))
+
+    def lookup(self, question_vector, docs):
+        """Cached answer for a question that retrieved `docs`, or None"""
+        key = chunk_key(docs)
+        query = self._unit(question_vector)
+        now = time.time()
+        with self._lock:
+            self._refresh()
+            best_id, best_score = None, self.threshold
+            expired = False
+            for rowid in list(self._by_key.get(key, ())):
+                entry = self._entries[rowid]
+                if now - entry[3] > self.ttl:
+                    self._drop(rowid)
+                    expired = True
+                    continue
+                score = float(np.dot(query, entry[1]))
+                if score >= best_score:
+                    best_id, best_score = rowid, score
+            if best_id is None:
+                self.misses += 1
+                if expired:
+                    self._db.commit()
+                return None
+            self.hits += 1
+            entry = self._entries[best_id]
+            entry[4] = now
+            self._db.execute("UPDATE answers SET last_used = ? WHERE id = ?", (now, best_id))
+            self._db.commit()
+            return entry[2]
+
+    def store(self, question, question_vector, docs, answer):
+        key = chunk_key(docs)
+        vector = self._unit(question_vector)
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO answers (chunk_key, question, vector, answer, created_at, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, question, vector.tobytes(), answer, now, now),
+            )
+            self._entries[cursor.lastrowid] = [key, vector, answer, now, now]
+            self._by_key.setdefault(key, set()).add(cursor.lastrowid)
+            # Evict least recently used past the size limit
+            if len(self._entries) > self.max_size:
+                by_age = sorted(self._entries, key=lambda rowid: self._entries[rowid][4])
+                for rowid in by_age[:len(self._entries) - self.max_size]:
+                    self._drop(rowid)
+            self._db.commit()
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.0%}), {len(self._entries)}/{self.max_size} answers"
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,237 @@
+"""
+Title autocomplete for inline mode (sorted prefix array)
+
+Built once from the indexed chunks: saint names ("Saint George", "Abba
+Samuel"), feast names ("Feast of the Cross", "Timket"), Synaxarium day
+headers ("Meskerem 17") and curriculum headings ("## Module 2: ...",
+"Lesson 1.1: ..."). Every title is keyed by its normalised text and by each
+later word ("george" finds "Saint George"), and the keys are kept in one
+sorted list, so a prefix lookup is two bisects - no embedding, no vector
+search. Typing "saint ge" answers from here; longer free-text questions
+still go to the retriever. A lookup ranks at most MAX_SCAN_KEYS keys, so a
+one-letter prefix costs the same as a long one.
+
+The index is built when the chunks change (ingestion) and saved to
+AUTOCOMPLETE_INDEX_DIR with the fingerprint of what it was built from:
+
+    keys.bin         all prefix keys, UTF-8, concatenated in sorted order
+    key_offsets.npy  int64 (K+1,) byte offsets into keys.bin
+    postings.npy     int32 (K, 2) [word position, entry] per key
+    entries.json     titles, kinds, chunk ids, offsets and counts
+    meta.json        version and fingerprint (written last)
+
+Later starts memory-map the arrays instead of re-extracting every title.
+"""
+
+import os
+import re
+import json
+import time
+from bisect import bisect_left
+import numpy as np
+
+from ethiopian_calendar import parse_heading, format_ethiopian_date
+
+WORD_PATTERN = re.compile(r"[\w']+", re.UNICODE)
+TITLE_WORD = r"[A-Z][\w'-]+"
+SAINT_PATTERN = re.compile(
+    rf"\b(?:St\.?|Saint|Saints|Abba|Abune|Abuna|Kidus|Mar|Archangel|Prophet|Apostle|Martyr)\s+{TITLE_WORD}(?:\s+(?:the\s+)?{TITLE_WORD}){{0,2}}"
+)
+FEAST_PATTERN = re.compile(rf"\b(?:Feast|Feasts|Festival)\s+of\s+(?:the\s+)?(?:{TITLE_WORD}\s*){{1,4}}")
+HEADING_PATTERN = re.compile(r"^\s*(?:#{1,6}\s+(.+?)|((?:Lesson|Chapter|Module|Unit|Part)\s+[\w.]+\s*[:.-]\s*.+?))\s*#*\s*$", re.MULTILINE)
+
+# Ethiopian feasts usually written by name alone; kept only if they occur in the sources
+KNOWN_FEASTS = [
+    "Timket", "Meskel", "Genna", "Fasika", "Hosanna", "Debre Tabor", "Kidane Mehret",
+    "Tinsae", "Erget", "Peraklitos", "Filseta", "Ledet", "Kulubi Gabriel", "Enkutatash",
+]
+
+KIND_ORDER = {"day": 0, "saint": 1, "feast": 2, "heading": 3}
+KIND_ICONS = {"day": "📅", "saint": "🕊️", "feast": "🎉", "heading": "📘"}
+MAX_TITLE_LENGTH = 80
+MAX_SCAN_KEYS = 500  # Keys ranked per lookup at most
+AUTOCOMPLETE_INDEX_DIR = os.getenv("AUTOCOMPLETE_INDEX_DIR", "./autocomplete_index")
+AUTOCOMPLETE_INDEX_VERSION = 1
+SKIPPED_KEY_WORDS = {"the", "of", "and", "a", "an", "in", "on", "st", "saint"}
+
+def normalize(text, complete=True):
+    """Lowercase words joined by single spaces; "St." becomes "saint" (only once typed out)"""
+    words = WORD_PATTERN.findall(text.lower())
+    last = len(words) - 1
+    return " ".join("saint" if word == "st" and (complete or i < last) else word for i, word in enumerate(words))
+
+class AutocompleteEntry:
+    __slots__ = ("title", "kind", "doc_idx", "offset", "count")
+
+    def __init__(self, title, kind, doc_idx, offset):
+        self.title = title
+        self.kind = kind
+        self.doc_idx = doc_idx  # Chunk where the title first occurs (None for Synaxarium days)
+        self.offset = offset    # Character offset of that occurrence (or Ethiopian (month, day))
+        self.count = 0          # Occurrences across all chunks, used for ranking
+
+class _KeyArray:
+    """Read-only sequence of the sorted keys in a memory-mapped keys.bin, bisect-able"""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+class AutocompleteIndex:
+    """Sorted (key, entry) array answering title prefix queries with bisect"""
+
+    def __init__(self, entries, keys=None, postings=None):
+        self.entries = entries
+        if keys is None:
+            rows = []
+            for entry_idx, entry in enumerate(entries):
+                words = normalize(entry.title).split()
+                for start, word in enumerate(words):
+                    if start == 0 or word not in SKIPPED_KEY_WORDS:
+                        rows.append((" ".join(words[start:]), start, entry_idx))
+            rows.sort()
+            keys = [key for key, _, _ in rows]
+            postings = np.asarray([(start, entry_idx) for _, start, entry_idx in rows], dtype=np.int32).reshape(-1, 2)
+        self.keys = keys
+        self.postings = postings
+
+    def __len__(self):
+        return len(self.entries)
+
+    def save(self, index_dir=AUTOCOMPLETE_INDEX_DIR, chunk_ids=None, fingerprint=None):
+        """Write the arrays (chunk_ids maps each entry's doc_idx to a stable chunk id)"""
+        os.makedirs(index_dir, exist_ok=True)
+        offsets = [0]
+        with open(os.path.join(index_dir, "keys.bin.tmp"), 'wb') as f:
+            for key in self.keys:
+                encoded = key.encode("utf-8")
+                f.write(encoded)
+                offsets.append(offsets[-1] + len(encoded))
+        with open(os.path.join(index_dir, "key_offsets.npy.tmp"), 'wb') as f:
+            np.save(f, np.asarray(offsets, dtype=np.int64))
+        with open(os.path.join(index_dir, "postings.npy.tmp"), 'wb') as f:
+            np.save(f, np.asarray(self.postings, dtype=np.int32).reshape(-1, 2))
+        with open(os.path.join(index_dir, "entries.json.tmp"), 'w', encoding='utf-8') as f:
+            json.dump([
+                [entry.title, entry.kind, None if entry.doc_idx is None else chunk_ids[entry.doc_idx], entry.offset, entry.count]
+                for entry in self.entries
+            ], f, ensure_ascii=False)
+        with open(os.path.join(index_dir, "meta.json.tmp"), 'w', encoding='utf-8') as f:
+            json.dump({"version": AUTOCOMPLETE_INDEX_VERSION, "fingerprint": fingerprint}, f)
+        # meta.json goes last: a directory with meta.json is always a complete index
+        for name in ("keys.bin", "key_offsets.npy", "postings.npy", "entries.json", "meta.json"):
+            os.replace(os.path.join(index_dir, name + ".tmp"), os.path.join(index_dir, name))
+
+    @classmethod
+    def load(cls, index_dir=AUTOCOMPLETE_INDEX_DIR, chunk_ids=None):
+        """Memory-map a saved index; chunk_ids gives the current doc_idx of each chunk id"""
+        row_of = {chunk_id: row for row, chunk_id in enumerate(chunk_ids or [])}
+        with open(os.path.join(index_dir, "entries.json"), 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+        entries = []
+        for title, kind, chunk_id, offset, count in rows:
+            if chunk_id is None:
+                entry = AutocompleteEntry(title, kind, None, tuple(offset))
+            else:
+                entry = AutocompleteEntry(title, kind, row_of[chunk_id], offset)  # KeyError: chunks changed
+            entry.count = count
+            entries.append(entry)
+        offsets = np.load(os.path.join(index_dir, "key_offsets.npy"), mmap_mode='r')
+        keys_path = os.path.join(index_dir, "keys.bin")
+        data = np.memmap(keys_path, dtype=np.uint8, mode='r') if os.path.getsize(keys_path) else np.zeros(0, dtype=np.uint8)
+        postings = np.load(os.path.join(index_dir, "postings.npy"), mmap_mode='r')
+        return cls(entries, _KeyArray(data, offsets), postings)
+
+    @classmethod
+    def from_chunks(cls, texts, metadatas, synaxarium_index=None):
+        """Extract titles from every chunk (and the Synaxarium day index if there is one)"""
+        by_title = {}
+
+        def add(title, kind, doc_idx, offset):
+            title = " ".join(title.split()).strip(" :-–.,;")
+            if len(title) < 3 or len(title) > MAX_TITLE_LENGTH:
+                return
+            key = (normalize(title), kind)
+            entry = by_title.get(key)
+            if entry is None:
+                entry = by_title[key] = AutocompleteEntry(title, kind, doc_idx, offset)
+            entry.count += 1
+
+        if synaxarium_index is not None:
+            for (month, day) in sorted(synaxarium_index.entries):
+                add(format_ethiopian_date(0, month, day, with_year=False), "day", None, (month, day))
+
+        feast_patterns = [(name, re.compile(rf"\b{re.escape(name)}\b")) for name in KNOWN_FEASTS]
+        for doc_idx, (text, metadata) in enumerate(zip(texts, metadatas)):
+            source = (metadata or {}).get("source")
+            for match in SAINT_PATTERN.finditer(text):
+                add(match.group(0), "saint", doc_idx, match.start())
+            for match in FEAST_PATTERN.finditer(text):
+                add(match.group(0), "feast", doc_idx, match.start())
+            for name, pattern in feast_patterns:
+                match = pattern.search(text)
+                if match:
+                    add(name, "feast", doc_idx, match.start())
+            if source == "curriculum":
+                for match in HEADING_PATTERN.finditer(text):
+                    add(match.group(1) or match.group(2), "heading", doc_idx, match.start())
+            elif source == "synaxarium" and synaxarium_index is None:
+                offset = 0
+                for line in text.splitlines(keepends=True):
+                    heading = parse_heading(line)
+                    if heading is not None:
+                        add(format_ethiopian_date(0, *heading, with_year=False), "day", doc_idx, offset)
+                    offset += len(line)
+        return cls(list(by_title.values()))
+
+    def search(self, query, limit=10):
+        """Entries whose title, or a later word of it, starts with the query"""
+        prefix = normalize(query, complete=False)
+        if not prefix:
+            return []
+        lo = bisect_left(self.keys, prefix)
+        hi = bisect_left(self.keys, prefix + "\uffff", lo)
+        hi = min(hi, lo + MAX_SCAN_KEYS)  # A short prefix can match most keys: rank the first ones only
+        best = {}
+        for start, entry_idx in np.asarray(self.postings[lo:hi]).tolist():
+            if start < best.get(entry_idx, 1 << 30):
+                best[entry_idx] = start
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (item[1] > 0, KIND_ORDER[self.entries[item[0]].kind], -self.entries[item[0]].count, self.entries[item[0]].title),
+        )
+        return [self.entries[entry_idx] for entry_idx, _ in ranked[:limit]]
+
+def read_autocomplete_fingerprint(index_dir=AUTOCOMPLETE_INDEX_DIR):
+    try:
+        with open(os.path.join(index_dir, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta.get("fingerprint") if meta.get("version") == AUTOCOMPLETE_INDEX_VERSION else None
+
+def build_autocomplete_index(bm25_index, synaxarium_index=None, index_dir=AUTOCOMPLETE_INDEX_DIR, fingerprint=None):
+    """
+    Index over the chunks already held by the BM25 index.
+
+    Loaded from index_dir when it was saved with the same fingerprint (the
+    chunks and Synaxarium it describes are unchanged), else built and saved.
+    """
+    start_time = time.time()
+    if fingerprint is not None and read_autocomplete_fingerprint(index_dir) == fingerprint:
+        try:
+            index = AutocompleteIndex.load(index_dir, bm25_index.ids)
+            print(f"✅ Autocomplete index loaded: {len(index):,} titles, {len(index.keys):,} prefix keys in {time.time() - start_time:.2f}s", flush=True)
+            return index
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Autocomplete index at {index_dir} unusable ({e}) - rebuilding", flush=True)
+    index = AutocompleteIndex.from_chunks(bm25_index.texts, bm25_index.metadatas, synaxarium_index)
+    index.save(index_dir, bm25_index.ids, fingerprint)
+    print(f"✅ Autocomplete index: {len(index):,} titles, {len(index.keys):,} prefix keys in {time.time() - start_time:.1f}s", flush=True)
+    return index
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark embedding backends (torch vs int8 ONNX)
+
+Reports per-query latency, build throughput, resident memory and how closely
+the ONNX vectors agree with the torch ones (cosine + top-3 retrieval overlap).
+Each backend runs in its own process so memory numbers don't mix.
+
+Run with: python benchmark_embeddings.py [--chunks 500] [--queries 200]
+"""
+
+import os
+import sys
+import time
+import glob
+import argparse
+import multiprocessing
+
+QUERIES = [
+    "Who is Saint Mary?",
+    "Tell me about fasting",
+    "What is Tasbeha?",
+    "Saint of the day Meskerem 17",
+    "Who are the Nine Saints?",
+    "What is Kidase?",
+    "Ark of the Covenant tradition",
+    "Why do Ethiopian Orthodox keep the Saturday Sabbath?",
+    "Who was Saint Yared?",
+    "What is Qene?",
+]
+
+def resident_memory_mb():
+    """Current RSS in MB (peak RSS where /proc isn't available)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def load_sample_chunks(limit):
+    """Chunk texts from sources/ (or test_curriculum.md), split like the bot does"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    files = sorted(glob.glob("sources/*.txt") + glob.glob("sources/*.md")) or ["test_curriculum.md"]
+    splitter = RecursiveCharacterTextSplitter(chunk_size=3000, chunk_overlap=300)
+    chunks = []
+    for path in files:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            chunks.extend(splitter.split_text(f.read()))
+        if len(chunks) >= limit:
+            break
+    return chunks[:limit]
+
+def run_backend(backend, chunks, query_rounds, results):
+    """Child process: load one backend and measure it"""
+    from embedding_backend import get_embeddings
+
+    base_mb = resident_memory_mb()
+    start = time.perf_counter()
+    embeddings = get_embeddings(backend)
+    load_s = time.perf_counter() - start
+    embeddings.embed_query("warm up")
+
+    latencies = []
+    for i in range(query_rounds):
+        start = time.perf_counter()
+        embeddings.embed_query(QUERIES[i % len(QUERIES)])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    start = time.perf_counter()
+    chunk_vectors = embeddings.embed_documents(chunks)
+    build_s = time.perf_counter() - start
+
+    results[backend] = {
+        "load_s": load_s,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1],
+        "chunks_per_s": len(chunks) / build_s if build_s else float("inf"),
+        "rss_mb": resident_memory_mb() - base_mb,
+        "chunk_vectors": chunk_vectors,
+        "query_vectors": [embeddings.embed_query(q) for q in QUERIES],
+    }
+
+def agreement(reference, candidate):
+    """Mean cosine between matching vectors, and top-3 overlap of query results over the chunks"""
+    import numpy as np
+    ref_chunks, cand_chunks = np.array(reference["chunk_vectors"]), np.array(candidate["chunk_vectors"])
+    ref_queries, cand_queries = np.array(reference["query_vectors"]), np.array(candidate["query_vectors"])
+    if ref_chunks.shape != cand_chunks.shape:
+        raise ValueError(f"dimension mismatch {ref_chunks.shape} vs {cand_chunks.shape} - not the same model")
+    cosine = float(np.mean(np.sum(ref_chunks * cand_chunks, axis=1)))
+    k = min(3, len(ref_chunks))
+    ref_top = np.argsort(-(ref_queries @ ref_chunks.T), axis=1)[:, :k]
+    # Candidate queries against the *reference* index = serving ONNX against a torch-built DB
+    mixed_top = np.argsort(-(cand_queries @ ref_chunks.T), axis=1)[:, :k]
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top, mixed_top)])
+    return cosine, float(overlap)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=500, help="chunks to embed for build throughput")
+    parser.add_argument("--queries", type=int, default=200, help="queries to time")
+    parser.add_argument("--backends", default="torch,onnx")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print("EMBEDDING BACKEND BENCHMARK")
+    print("="*60 + "\n")
+
+    chunks = load_sample_chunks(args.chunks)
+    print(f"📚 {len(chunks)} sample chunks, {args.queries} timed queries\n")
+
+    ctx = multiprocessing.get_context("spawn")
+    manager = ctx.Manager()
+    results = manager.dict()
+    for backend in args.backends.split(","):
+        print(f"⏱️  Running {backend}...", flush=True)
+        proc = ctx.Process(target=run_backend, args=(backend, chunks, args.queries, results))
+        proc.start()
+        proc.join()
+        if backend not in results:
+            print(f"   ❌ {backend} failed (see traceback above)")
+
+    print(f"\n{'backend':<8} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'chunks/s':>9} {'RSS MB':>8}")
+    for backend, r in results.items():
+        print(f"{backend:<8} {r['load_s']:>7.1f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['chunks_per_s']:>9.1f} {r['rss_mb']:>8.0f}")
+
+    if "torch" in results and "onnx" in results:
+        cosine, overlap = agreement(results["torch"], results["onnx"])
+        print(f"\n🔗 ONNX vs torch: mean cosine {cosine:.4f}, top-3 overlap {overlap:.0%} (ONNX queries on a torch-built index)")
+        if overlap < 0.9:
+            print("   ⚠️ Low overlap - re-index with EMBEDDING_BACKEND=onnx before serving with it")
+    print()
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    main()
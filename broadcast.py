@@ -0,0 +1,348 @@
+"""
+Rate-limit-aware broadcast engine for the daily saint message
+
+Sends one message to many chats with bounded concurrency while staying under
+Telegram's limits: about 30 messages/s across all chats (BROADCAST_RATE, kept
+a little below) and one message/s per chat. A RetryAfter flood-control error
+pauses every sender for the requested time and the message is retried;
+chats that blocked the bot or no longer exist are reported as "blocked" so
+the caller can prune them.
+
+Timeouts and network errors are only retried (with backoff) when the request
+provably never reached Telegram (connect error/timeout, pool timeout). A
+timeout after the request was sent may well have delivered the message, so
+that chat is reported as "uncertain" and not re-sent - at most once rather
+than twice. BROADCAST_RETRY_UNCERTAIN=true retries those too (at least
+once, duplicates possible).
+
+BroadcastJournal makes a broadcast crash-safe: the payload and every chat's
+delivery state are appended to BROADCAST_JOURNAL_PATH, so after a restart
+the broadcast resumes with the chats not yet reached. Before each send an
+"attempt" record is made durable (write-ahead); concurrent senders share one
+write + fsync, done in a thread, so the event loop never blocks on the disk.
+Results are buffered and written with the next flush.
+
+Crash between a send and its result record: the chat is left in "attempt"
+state, and a resumed broadcast skips it (reported as uncertain) instead of
+re-sending - at most once, never a double send. The cost is that a crash
+right after the attempt record but before the request went out also skips
+that chat. When delivery completes the journal is compacted to a single
+completion record, which also stops the same broadcast from running twice.
+"""
+
+import os
+import json
+import time
+import asyncio
+from datetime import timedelta
+import httpx
+from telegram.error import RetryAfter, Forbidden, BadRequest, TimedOut, NetworkError
+
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "20"))
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))  # Messages/s across all chats
+BROADCAST_PER_CHAT_INTERVAL = 1.0  # Seconds between messages to the same chat
+BROADCAST_MAX_RETRIES = int(os.getenv("BROADCAST_MAX_RETRIES", "5"))
+BROADCAST_JOURNAL_PATH = os.getenv("BROADCAST_JOURNAL_PATH", "broadcast_journal.jsonl")
+BROADCAST_RETRY_UNCERTAIN = os.getenv("BROADCAST_RETRY_UNCERTAIN", "false").lower() in ("1", "true", "yes")
+
+# BadRequest messages meaning the chat is gone for good
+GONE_CHAT_ERRORS = ("chat not found", "user is deactivated", "bot was kicked", "peer_id_invalid")
+
+def request_not_sent(error):
+    """True if a TimedOut/NetworkError happened before the request reached Telegram"""
+    return isinstance(error.__cause__, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+def retry_after_seconds(error):
+    value = error.retry_after
+    return value.total_seconds() if isinstance(value, timedelta) else float(value)
+
+class BroadcastStats:
+    """Delivery counts and throughput of one broadcast"""
+
+    def __init__(self, total):
+        self.total = total
+        self.sent = 0
+        self.failed = 0
+        self.blocked = []
+        self.uncertain = []  # Request sent but no answer: maybe delivered, not re-sent
+        self.retries = 0
+        self.flood_waits = 0
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self):
+        rate = self.sent / self.elapsed if self.elapsed > 0 else 0.0
+        return (f"{self.sent}/{self.total} sent, {len(self.blocked)} blocked, {len(self.uncertain)} uncertain, {self.failed} failed, "
+                f"{self.retries} retries ({self.flood_waits} flood waits) in {self.elapsed:.1f}s ({rate:.1f} msg/s)")
+
+class Broadcaster:
+    """Paced, concurrent send_message to a list of chats"""
+
+    def __init__(self, bot, concurrency=BROADCAST_CONCURRENCY, rate=BROADCAST_RATE,
+                 per_chat_interval=BROADCAST_PER_CHAT_INTERVAL, max_retries=BROADCAST_MAX_RETRIES,
+                 retry_uncertain=BROADCAST_RETRY_UNCERTAIN):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.interval = 1.0 / rate
+        self.per_chat_interval = per_chat_interval
+        self.max_retries = max_retries
+        self.retry_uncertain = retry_uncertain
+        self._next_slot = 0.0
+        self._paused_until = 0.0
+        self._last_sent = {}  # chat_id -> monotonic time of the last attempt
+        self._pace_lock = asyncio.Lock()
+
+    async def _wait_for_slot(self, chat_id):
+        """Reserve the next global send slot, respecting flood pauses and per-chat spacing"""
+        async with self._pace_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot, self._paused_until,
+                       self._last_sent.get(chat_id, -self.per_chat_interval) + self.per_chat_interval)
+            self._next_slot = slot + self.interval
+            self._last_sent[chat_id] = slot
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _send_one(self, chat_id, text, parse_mode, stats, on_attempt=None):
+        """"sent", "blocked", "uncertain" or "failed" after retries"""
+        for attempt in range(self.max_retries + 1):
+            await self._wait_for_slot(chat_id)
+            if on_attempt is not None and attempt == 0:
+                await on_attempt(chat_id)
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=parse_mode)
+                return "sent"
+            except RetryAfter as e:
+                # Flood control is per bot: hold every sender, not just this one
+                wait = retry_after_seconds(e) + 0.5
+                self._paused_until = max(self._paused_until, time.monotonic() + wait)
+                stats.flood_waits += 1
+                print(f"   ⏸️ Flood control: pausing broadcast {wait:.1f}s", flush=True)
+            except Forbidden:
+                return "blocked"
+            except BadRequest as e:
+                if any(marker in str(e).lower() for marker in GONE_CHAT_ERRORS):
+                    return "blocked"
+                print(f"   ❌ Failed to send to {chat_id}: {e}", flush=True)
+                return "failed"
+            except (TimedOut, NetworkError) as e:
+                if not (self.retry_uncertain or request_not_sent(e)):
+                    print(f"   ⚠️ {chat_id}: {e!r} after the request was sent - may have been delivered, not re-sent", flush=True)
+                    return "uncertain"
+                if attempt < self.max_retries:
+                    await asyncio.sleep(min(2 ** attempt, 30))
+                print(f"   ⚠️ Transient error for {chat_id} (attempt {attempt + 1}): {e}", flush=True)
+            if attempt < self.max_retries:
+                stats.retries += 1
+        return "failed"
+
+    async def send_all(self, chat_ids, text, parse_mode=None, on_attempt=None, on_result=None):
+        """
+        Send text to every chat; on_attempt(chat_id) is awaited before the first send, on_result(chat_id, status) called after.
+
+        chat_ids is an iterable, or an async iterable of pages (lists of chat ids) that is
+        consumed only as fast as messages go out, so a large subscriber table is never
+        held in memory at once.
+        """
+        stats = BroadcastStats(0)
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        done = object()
+        feed_errors = []
+
+        async def feed():
+            try:
+                if hasattr(chat_ids, "__aiter__"):
+                    async for page in chat_ids:
+                        for chat_id in page:
+                            stats.total += 1
+                            await queue.put(chat_id)
+                else:
+                    for chat_id in chat_ids:
+                        stats.total += 1
+                        await queue.put(chat_id)
+            except Exception as e:
+                feed_errors.append(e)  # Let the workers drain, then fail the broadcast (it stays resumable)
+            for _ in range(self.concurrency):
+                await queue.put(done)
+
+        async def worker():
+            while True:
+                chat_id = await queue.get()
+                if chat_id is done:
+                    return
+                try:
+                    status = await self._send_one(chat_id, text, parse_mode, stats, on_attempt)
+                except Exception as e:
+                    print(f"   ❌ Failed to send to {chat_id}: {e}", flush=True)
+                    status = "failed"
+                if status == "sent":
+                    stats.sent += 1
+                elif status == "blocked":
+                    stats.blocked.append(chat_id)
+                elif status == "uncertain":
+                    stats.uncertain.append(chat_id)
+                else:
+                    stats.failed += 1
+                if on_result is not None:
+                    on_result(chat_id, status)
+
+        await asyncio.gather(feed(), *(worker() for _ in range(self.concurrency)))
+        stats.finished = time.monotonic()
+        if feed_errors:
+            raise feed_errors[0]
+        return stats
+
+class BroadcastJournal:
+    """
+    Append-only JSON-lines record of one broadcast: header, then per-chat states.
+
+    The recipient list is not stored: it is streamed from the subscriber store,
+    and on resume every chat without a journaled state is still pending.
+    """
+
+    def __init__(self, path=BROADCAST_JOURNAL_PATH):
+        self.path = path
+        self.broadcast_id = None
+        self.text = None
+        self.parse_mode = None
+        self.states = {}  # chat_id -> "attempt" | "sent" | "blocked" | "uncertain" | "failed"
+        self.completed = False
+        self.summary = None
+        self._file = None
+        self._buffer = []  # Records not yet written
+        self._appended = 0  # Records buffered so far
+        self._durable = 0   # Records written and fsync'd
+        self._flush_task = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # Torn last line from a crash mid-write
+                if "broadcast_id" in record:
+                    self.broadcast_id = record["broadcast_id"]
+                    self.text = record.get("text")
+                    self.parse_mode = record.get("parse_mode")
+                    self.completed = record.get("completed", False)
+                    self.summary = record.get("summary")
+                else:
+                    self.states[record["chat_id"]] = record["state"]
+
+    @property
+    def unfinished(self):
+        return self.broadcast_id is not None and not self.completed
+
+    async def pending(self, pages):
+        """Filter pages of chat ids (async iterable) down to chats never attempted"""
+        async for page in pages:
+            page = [chat_id for chat_id in page if chat_id not in self.states]
+            if page:
+                yield page
+
+    def uncertain(self):
+        """Chats whose send started but was never recorded - skipped rather than risk a duplicate"""
+        return [chat_id for chat_id, state in self.states.items() if state == "attempt"]
+
+    def begin(self, broadcast_id, text, parse_mode):
+        self.close()
+        self.broadcast_id, self.text, self.parse_mode = broadcast_id, text, parse_mode
+        self.states = {}
+        self.completed, self.summary = False, None
+        self._rewrite({"broadcast_id": broadcast_id, "text": text, "parse_mode": parse_mode})
+
+    def _append(self, record):
+        self._buffer.append(record)
+        self._appended += 1
+
+    def _write(self, records):
+        """Append and fsync; on failure the file is cut back, so a retry never follows a torn line"""
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        start = self._file.tell()
+        try:
+            self._file.write("".join(json.dumps(record) + "\n" for record in records))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            try:
+                self._file.truncate(start)
+            except OSError:
+                pass
+            raise
+
+    async def _flush(self):
+        try:
+            batch, self._buffer = self._buffer, []
+            written = self._appended
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except BaseException:
+                # Back in front of newer records: the waiters see the error, the next sync retries
+                self._buffer = batch + self._buffer
+                raise
+            self._durable = written
+        finally:
+            self._flush_task = None
+
+    async def sync(self):
+        """Wait until every record buffered so far is on disk (group commit)"""
+        target = self._appended
+        while self._durable < target:
+            if self._flush_task is None:
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush())
+            await asyncio.shield(self._flush_task)
+
+    async def mark_attempt(self, chat_id):
+        """Write-ahead record: returns once it is durable, so the send may go out"""
+        self.states[chat_id] = "attempt"
+        self._append({"chat_id": chat_id, "state": "attempt"})
+        await self.sync()
+
+    def mark_result(self, chat_id, status):
+        """Buffered; written with the next attempt's flush or by sync()/aclose()"""
+        self.states[chat_id] = status
+        self._append({"chat_id": chat_id, "state": status})
+
+    def complete(self, summary):
+        """Compact to a single completion record"""
+        self.close()
+        self.completed, self.summary = True, summary
+        self.states = {}
+        self._rewrite({"broadcast_id": self.broadcast_id, "completed": True, "summary": summary})
+
+    def _rewrite(self, header):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(header) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        if self._buffer:
+            batch, self._buffer = self._buffer, []
+            written = self._appended
+            try:
+                self._write(batch)
+            except BaseException:
+                self._buffer = batch + self._buffer
+                raise
+            self._durable = written
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    async def aclose(self):
+        """Write what is still buffered (off the event loop) and close"""
+        if self._flush_task is not None:
+            await asyncio.shield(self._flush_task)
+        await asyncio.to_thread(self.close)
@@ -7,8 +7,13 @@ Run this locally, then commit chroma_db_bot/ to repo
 import os
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.document_loaders import TextLoader
+from embedding_pool import EmbeddingPool, add_batch, default_workers
+from source_manifest import assign_chunk_ids
+from embedding_backend import embedding_backend_name
+from embedding_service import get_shared_embeddings, served_by_daemon
+
+BATCH_SIZE = 2000
 
 def load_all_sources():
     """Load all available document sources"""
@@ -21,6 +26,7 @@ def load_all_sources():
         docs = loader.load()
         for doc in docs:
             doc.metadata["source"] = "curriculum"
+            doc.metadata["filename"] = "Curriculum.md"
         documents.extend(docs)
         print(f"   ✅ Loaded {len(docs)} curriculum documents")
     
@@ -31,6 +37,7 @@ def load_all_sources():
         docs = loader.load()
         for doc in docs:
             doc.metadata["source"] = "synaxarium"
+            doc.metadata["filename"] = "synaxarium.txt"
         documents.extend(docs)
         print(f"   ✅ Loaded {len(docs)} synaxarium documents")
     
@@ -58,10 +65,8 @@ def main():
     print(f"   Created {len(splits)} chunks")
     
     # Create embeddings
-    print("\n🧠 Loading embeddings model...")
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
+    print(f"\n🧠 Loading embeddings model ({embedding_backend_name()} backend)...")
+    embeddings = get_shared_embeddings()
     
     # Build vector database
     print("\n🏗️  Building vector database (this will take a few minutes)...")
@@ -73,12 +78,31 @@ def main():
         shutil.rmtree(db_path)
         print(f"   Removed existing DB at {db_path}")
     
-    vectorstore = Chroma.from_documents(
-        documents=splits,
-        embedding=embeddings,
-        persist_directory=db_path
+    vectorstore = Chroma(
+        persist_directory=db_path,
+        embedding_function=embeddings
     )
     
+    # Shard embedding across worker processes (EMBEDDING_WORKERS=0 keeps it in-process).
+    # With the daemon running, its model does the embedding: pool workers would load their own.
+    workers = default_workers()
+    if served_by_daemon(embeddings) and workers > 1:
+        print(f"   ⚙️  Embedding daemon in use - not starting {workers} embedding workers", flush=True)
+        workers = 0
+    pool = EmbeddingPool(workers) if workers > 1 else None
+    total_batches = (len(splits) + BATCH_SIZE - 1) // BATCH_SIZE
+    # Same "<filename>#<n>" ids as the bot's own build, so its incremental updates can replace them
+    split_ids = assign_chunk_ids(splits)
+    try:
+        for i in range(0, len(splits), BATCH_SIZE):
+            batch = splits[i:i + BATCH_SIZE]
+            ids = split_ids[i:i + len(batch)]
+            chunks_per_sec = add_batch(vectorstore, batch, ids, pool)
+            print(f"   ✓ Batch {i // BATCH_SIZE + 1}/{total_batches} ({len(batch):,} chunks, {chunks_per_sec:,.1f} chunks/s)", flush=True)
+    finally:
+        if pool is not None:
+            pool.close()
+    
     print(f"\n✅ Vector database built and saved to {db_path}")
     print("\nNext steps:")
     print("1. git add chroma_db_bot/")
@@ -1,9 +1,20 @@
 """
 Convert all PDFs in raw files/ to text files in sources/
+
+Usage:
+    python convert_pdfs.py                  # serial (one file at a time)
+    python convert_pdfs.py --workers 8      # parallel across files
+    python convert_pdfs.py --workers 8 --page-chunk 200
+                                            # also split very large PDFs into page ranges
 """
 import os
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+from source_manifest import SourceManifest
+
 try:
     from pypdf import PdfReader
 except ImportError:
@@ -11,30 +22,190 @@ except ImportError:
     os.system("pip install -q pypdf")
     from pypdf import PdfReader
 
+# Records size/mtime/hash of every converted PDF so changed PDFs get re-converted
+MANIFEST_NAME = "pdf_manifest.json"
+
+# PDFs with at least this many pages are split across workers page-range by page-range
+LARGE_PDF_PAGES = 400
+
+def extract_page_range(pdf_path, start, end):
+    """Extract non-empty page texts for pages [start, end) - runs in worker processes"""
+    reader = PdfReader(pdf_path)
+    text_content = []
+    for page_num in range(start, min(end, len(reader.pages))):
+        text = reader.pages[page_num].extract_text()
+        if text.strip():
+            text_content.append(text)
+    return text_content
+
+def iter_page_texts(reader):
+    """Yield non-empty page texts one page at a time"""
+    for page in reader.pages:
+        text = page.extract_text()
+        if text.strip():
+            yield text
+
+def write_text_file(pdf_path, output_path, page_texts):
+    """
+    Stream page texts to the sources/ file as they arrive, return character count.
+    
+    Pages are written one by one (joined by blank lines) instead of building the
+    whole book in memory, so a several-thousand-page PDF costs one page of text at
+    a time. Output goes to a .part file that is renamed on success, so a crash
+    never leaves a truncated .txt that the next run would skip as "already exists".
+    """
+    output_path = Path(output_path)
+    part_path = output_path.with_name(output_path.name + ".part")
+    chars = 0
+    try:
+        with open(part_path, 'w', encoding='utf-8') as f:
+            f.write(f"SOURCE: {pdf_path.name}\n")
+            f.write("=" * 80 + "\n\n")
+            for text in page_texts:
+                if chars:
+                    f.write("\n\n")
+                    chars += 2
+                f.write(text)
+                chars += len(text)
+        os.replace(part_path, output_path)
+    finally:
+        if part_path.exists():
+            part_path.unlink()
+    return chars
+
 def convert_pdf_to_text(pdf_path, output_path):
     """Extract text from PDF and save to text file"""
     try:
         reader = PdfReader(pdf_path)
-        text_content = []
         
-        # Extract text from all pages
-        for page_num, page in enumerate(reader.pages, 1):
-            text = page.extract_text()
-            if text.strip():
-                text_content.append(text)
+        # Extract and write pages as we go
+        chars = write_text_file(pdf_path, output_path, iter_page_texts(reader))
         
-        # Write to text file
-        full_text = "\n\n".join(text_content)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(f"SOURCE: {pdf_path.name}\n")
-            f.write("=" * 80 + "\n\n")
-            f.write(full_text)
-        
-        return len(reader.pages), len(full_text)
+        return len(reader.pages), chars
     except Exception as e:
         return None, str(e)
 
-def main():
+def print_result(idx, total, pdf_path, pages, result, inline=True):
+    """Print one conversion result line, return True on success"""
+    prefix = "" if inline else f"[{idx}/{total}] {pdf_path.name[:60]}... "
+    if pages is not None:
+        print(f"{prefix}✅ ({pages} pages, {result:,} chars)", flush=True)
+        return True
+    print(f"{prefix}❌ Error: {result}", flush=True)
+    return False
+
+def convert_serial(jobs, total, failed_files, manifest):
+    """Convert PDFs one at a time in this process"""
+    success_count = 0
+    total_chars = 0
+    
+    for idx, pdf_path, output_path in jobs:
+        print(f"[{idx}/{total}] {pdf_path.name[:60]}...", end=" ", flush=True)
+        
+        try:
+            pages, result = convert_pdf_to_text(pdf_path, output_path)
+            
+            if print_result(idx, total, pdf_path, pages, result):
+                success_count += 1
+                total_chars += result
+                manifest.record(pdf_path.name, pdf_path, output=output_path.name)
+            else:
+                failed_files.append((pdf_path.name, result))
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Conversion interrupted by user")
+            break
+        except Exception as e:
+            print(f"❌ Crash: {str(e)[:50]}")
+            failed_files.append((pdf_path.name, f"Crash: {e}"))
+    
+    return success_count, total_chars
+
+def submit_window(pool, tasks, window):
+    """
+    Submit (fn, args) tasks in order, yielding their futures in the same order.
+    
+    At most window tasks are submitted ahead of the consumer, so finished page
+    ranges of a huge PDF wait in memory only a few at a time, not the whole book.
+    """
+    inflight = deque()
+    for fn, args in tasks:
+        inflight.append(pool.submit(fn, *args))
+        if len(inflight) >= window:
+            yield inflight.popleft()
+    while inflight:
+        yield inflight.popleft()
+
+def convert_parallel(jobs, total, failed_files, manifest, workers, page_chunk):
+    """
+    Convert PDFs on a process pool.
+    
+    Small PDFs are one task each. PDFs with LARGE_PDF_PAGES+ pages are split into
+    page_chunk-sized ranges so a single huge commentary doesn't pin one core while
+    the rest of the pool sits idle. Page texts are reassembled in page order, so
+    the output is byte-identical to the serial path. Tasks are submitted at most
+    workers * 2 ahead of the writer (see submit_window).
+    """
+    success_count = 0
+    total_chars = 0
+    
+    # Plan: (idx, pdf_path, output_path, page_count, number of tasks or error)
+    plan = []
+    tasks = []
+    for idx, pdf_path, output_path in jobs:
+        try:
+            page_count = len(PdfReader(pdf_path).pages) if page_chunk else 0
+        except Exception as e:
+            plan.append((idx, pdf_path, output_path, None, str(e)))
+            continue
+        
+        if page_chunk and page_count >= LARGE_PDF_PAGES:
+            ranges = [(extract_page_range, (pdf_path, start, start + page_chunk)) for start in range(0, page_count, page_chunk)]
+            tasks.extend(ranges)
+            plan.append((idx, pdf_path, output_path, page_count, len(ranges)))
+        else:
+            tasks.append((convert_pdf_to_text, (pdf_path, output_path)))
+            plan.append((idx, pdf_path, output_path, None, 1))
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = submit_window(pool, tasks, workers * 2)
+        
+        # Report in submission order so the log reads exactly like the serial run
+        try:
+            for idx, pdf_path, output_path, page_count, work in plan:
+                unread = 0 if isinstance(work, str) else work
+                
+                def range_texts():
+                    nonlocal unread
+                    while unread:
+                        unread -= 1
+                        yield from next(futures).result()
+                
+                try:
+                    if isinstance(work, str):
+                        pages, result = None, work
+                    elif page_count is not None:
+                        pages, result = page_count, write_text_file(pdf_path, output_path, range_texts())
+                    else:
+                        unread = 0
+                        pages, result = next(futures).result()
+                except Exception as e:
+                    pages, result = None, str(e)
+                for _ in range(unread):
+                    next(futures)  # Ranges of a failed PDF: keep the stream aligned
+                
+                if print_result(idx, total, pdf_path, pages, result, inline=False):
+                    success_count += 1
+                    total_chars += result
+                    manifest.record(pdf_path.name, pdf_path, output=output_path.name)
+                else:
+                    failed_files.append((pdf_path.name, result))
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Conversion interrupted by user")
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    return success_count, total_chars
+
+def main(workers=1, page_chunk=0):
     raw_dir = Path("raw files")
     sources_dir = Path("sources")
     sources_dir.mkdir(exist_ok=True)
@@ -42,42 +213,56 @@ def main():
     # Get all PDFs
     pdf_files = sorted(raw_dir.glob("*.pdf"))
     total = len(pdf_files)
+    manifest = SourceManifest(str(sources_dir / MANIFEST_NAME))
     
     print(f"\n📚 Converting {total} PDFs to text files...\n")
+    if workers > 1:
+        print(f"⚡ Parallel mode: {workers} workers" + (f", {page_chunk}-page ranges for PDFs with {LARGE_PDF_PAGES}+ pages" if page_chunk else "") + "\n")
     
     success_count = 0
     failed_files = []
     total_chars = 0
+    jobs = []
     
     for idx, pdf_path in enumerate(pdf_files, 1):
         # Create text filename (keep original name, change extension)
         txt_filename = pdf_path.stem + ".txt"
         output_path = sources_dir / txt_filename
         
-        # Skip if already converted
+        # Skip if already converted and the PDF hasn't changed since
         if output_path.exists():
-            print(f"[{idx}/{total}] {pdf_path.name[:60]}... ⏭️  (already exists)")
-            success_count += 1
-            continue
-        
-        print(f"[{idx}/{total}] {pdf_path.name[:60]}...", end=" ", flush=True)
-        
-        try:
-            pages, result = convert_pdf_to_text(pdf_path, output_path)
-            
-            if pages is not None:
-                print(f"✅ ({pages} pages, {result:,} chars)")
+            if pdf_path.name not in manifest:
+                # Converted before the manifest existed - adopt it as the baseline
+                manifest.record(pdf_path.name, pdf_path, output=txt_filename)
+                print(f"[{idx}/{total}] {pdf_path.name[:60]}... ⏭️  (already exists)")
                 success_count += 1
-                total_chars += result
-            else:
-                print(f"❌ Error: {result}")
-                failed_files.append((pdf_path.name, result))
-        except KeyboardInterrupt:
-            print("\n\n⚠️  Conversion interrupted by user")
-            break
-        except Exception as e:
-            print(f"❌ Crash: {str(e)[:50]}")
-            failed_files.append((pdf_path.name, f"Crash: {e}"))
+                continue
+            if not manifest.is_changed(pdf_path.name, pdf_path):
+                print(f"[{idx}/{total}] {pdf_path.name[:60]}... ⏭️  (unchanged)")
+                success_count += 1
+                continue
+            print(f"[{idx}/{total}] {pdf_path.name[:60]}... 🔁 (PDF changed, re-converting)")
+        
+        jobs.append((idx, pdf_path, output_path))
+    
+    # Drop outputs of PDFs that were removed from raw files/
+    if raw_dir.is_dir():
+        current = {pdf_path.name for pdf_path in pdf_files}
+        for name in sorted(manifest.names() - current):
+            entry = manifest.remove(name)
+            stale_path = sources_dir / entry.get("output", Path(name).stem + ".txt")
+            if stale_path.exists():
+                stale_path.unlink()
+                print(f"🗑️  Removed {stale_path} ({name} no longer in {raw_dir})")
+    
+    try:
+        if workers > 1:
+            converted, total_chars = convert_parallel(jobs, total, failed_files, manifest, workers, page_chunk)
+        else:
+            converted, total_chars = convert_serial(jobs, total, failed_files, manifest)
+        success_count += converted
+    finally:
+        manifest.save()
     
     print(f"\n{'='*80}")
     print(f"✅ Successfully converted: {success_count}/{total}")
@@ -94,4 +279,10 @@ def main():
     print(f"🔄 Next: Restart bot to rebuild vector database with new sources\n")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Convert raw files/*.pdf to sources/*.txt")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes (default 1 = serial; 0 = one per CPU)")
+    parser.add_argument("--page-chunk", type=int, default=0,
+                        help=f"split PDFs with {LARGE_PDF_PAGES}+ pages into ranges of this many pages (parallel mode only)")
+    args = parser.parse_args()
+    main(workers=args.workers or os.cpu_count() or 1, page_chunk=args.page_chunk)
@@ -6,7 +6,7 @@ Tests all edge cases and scenarios before showing to Dr. Meskrem
 import os
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from embedding_service import get_shared_embeddings
 from langchain_community.document_loaders import TextLoader
 from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
@@ -481,9 +481,7 @@ def setup_rag_system():
     )
     splits = text_splitter.split_documents(documents)
     
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
+    embeddings = get_shared_embeddings("torch")
     
     vectorstore = Chroma.from_documents(
         documents=splits,
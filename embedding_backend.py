@@ -0,0 +1,194 @@
+"""
+Selectable embedding backend for all-MiniLM-L6-v2
+
+EMBEDDING_BACKEND=torch (default) - full-precision sentence-transformers model
+EMBEDDING_BACKEND=onnx            - int8-quantized ONNX export of the same model
+
+The ONNX backend reproduces the sentence-transformers pipeline (mean pooling
+over the attention mask + L2 normalisation), so its vectors are close enough
+to the torch ones to query an index built with either backend - run
+benchmark_embeddings.py to see the agreement on your sources. For exact
+consistency, re-index with the backend you serve with:
+
+    EMBEDDING_BACKEND=onnx python build_vector_db.py
+
+The model is exported on first use (needs torch + onnx) into ONNX_MODEL_DIR,
+or ahead of time with: python embedding_backend.py --export
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "./onnx_model")
+ONNX_MODEL_FILE = "model_int8.onnx"
+MAX_SEQ_LENGTH = 256  # Same truncation as the sentence-transformers model
+ONNX_BATCH_SIZE = 32
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+
+def embedding_backend_name():
+    return os.getenv("EMBEDDING_BACKEND", "torch").lower()
+
+def export_onnx_model(output_dir=ONNX_MODEL_DIR, model_name=EMBEDDING_MODEL):
+    """Export the transformer to ONNX and dynamically quantize its weights to int8"""
+    import torch
+    from transformers import AutoTokenizer, AutoModel
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    print(f"📦 Exporting {model_name} to ONNX (int8) in {output_dir}...", flush=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name).eval()
+    os.makedirs(output_dir, exist_ok=True)
+    tokenizer.save_pretrained(output_dir)
+
+    class HiddenStates(torch.nn.Module):
+        """Fixed positional signature for the exporter, returns last_hidden_state only"""
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                token_type_ids=token_type_ids,
+            ).last_hidden_state
+
+    sample = tokenizer(["Saint of the Day"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            HiddenStates(model),
+            tuple(sample[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14,
+            dynamo=False,
+        )
+
+    int8_path = os.path.join(output_dir, ONNX_MODEL_FILE)
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    os.remove(fp32_path)
+    size = os.path.getsize(int8_path)
+    print(f"   ✅ Saved {int8_path} ({size / (1024*1024):.1f} MB)\n", flush=True)
+    return int8_path
+
+class OnnxEmbeddings(Embeddings):
+    """LangChain Embeddings running the int8 ONNX export on onnxruntime (CPU)"""
+
+    def __init__(self, model_dir=ONNX_MODEL_DIR, num_threads=None):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        model_path = os.path.join(model_dir, ONNX_MODEL_FILE)
+        if not os.path.exists(model_path):
+            export_onnx_model(model_dir)
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+    def _encode(self, texts):
+        import numpy as np
+
+        vectors = []
+        for i in range(0, len(texts), ONNX_BATCH_SIZE):
+            encoded = self.tokenizer(
+                texts[i:i + ONNX_BATCH_SIZE],
+                padding=True,
+                truncation=True,
+                max_length=MAX_SEQ_LENGTH,
+                return_tensors="np",
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            hidden = self.session.run(None, feeds)[0]
+            # Mean pooling over real tokens, then L2 normalise (as sentence-transformers does)
+            mask = encoded["attention_mask"][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.tolist())
+        return vectors
+
+    def embed_documents(self, texts):
+        return self._encode([text.replace("\n", " ") for text in texts])
+
+    def embed_query(self, text):
+        return self._encode([text.replace("\n", " ")])[0]
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Bounded LRU cache of query embeddings in front of another Embeddings.
+
+    Keys are the query lowercased with whitespace collapsed - the model is
+    uncased and newlines are replaced anyway, so that gives the same vector.
+    Document embedding is passed straight through. Thread-safe, since
+    ask_question runs in executor threads.
+    """
+
+    def __init__(self, embeddings, max_size=QUERY_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(text.lower().split())
+
+    def embed_query(self, text):
+        key = self.normalize(text)
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return vector
+            self.misses += 1
+        # Compute outside the lock; a concurrent miss on the same key just computes twice
+        vector = self.embeddings.embed_query(key)
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def stats(self):
+        total = self.hits + self.misses
+        rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits / {self.misses} misses ({rate:.0%}), {len(self._cache)}/{self.max_size} cached"
+
+def get_embeddings(backend=None, num_threads=None):
+    """Embeddings for the configured backend (EMBEDDING_BACKEND)"""
+    backend = backend or embedding_backend_name()
+    if backend == "onnx":
+        return OnnxEmbeddings(num_threads=num_threads)
+    if backend != "torch":
+        raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend!r} (expected 'torch' or 'onnx')")
+    if num_threads:
+        import torch
+        torch.set_num_threads(num_threads)
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+if __name__ == "__main__":
+    import sys
+    if "--export" in sys.argv:
+        export_onnx_model()
+    else:
+        print("Usage: python embedding_backend.py --export")
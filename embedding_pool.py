@@ -0,0 +1,99 @@
+"""
+Multi-process embedding for index builds
+
+HuggingFaceEmbeddings runs the model in one process, so a full build is bound
+to a single core. EmbeddingPool shards chunk texts across worker processes,
+each holding its own copy of the model (torch or ONNX backend, see
+embedding_backend.py) with a pinned thread count, and returns the vectors in
+input order so they can be written to Chroma in bulk.
+
+Configure with EMBEDDING_WORKERS (0 or 1 = in-process) and EMBEDDING_SHARD_SIZE.
+"""
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from embedding_backend import embedding_backend_name, get_embeddings
+
+DEFAULT_SHARD_SIZE = 64
+
+# Model held by each worker process (set by _init_worker)
+_worker_model = None
+
+def default_workers():
+    """EMBEDDING_WORKERS, or up to 4 workers (one model copy each) on multi-core boxes"""
+    configured = os.getenv("EMBEDDING_WORKERS")
+    if configured:
+        return int(configured)
+    cpus = os.cpu_count() or 1
+    return min(4, cpus) if cpus > 1 else 0
+
+def _init_worker(backend, threads):
+    global _worker_model
+    _worker_model = get_embeddings(backend, num_threads=threads)
+
+def _embed_shard(texts):
+    return _worker_model.embed_documents(texts)
+
+class EmbeddingPool:
+    """Process pool of embedding model replicas"""
+
+    def __init__(self, workers, backend=None, shard_size=None):
+        self.workers = workers
+        self.shard_size = shard_size or int(os.getenv("EMBEDDING_SHARD_SIZE", DEFAULT_SHARD_SIZE))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        backend = backend or embedding_backend_name()
+        print(f"   ⚙️  Starting {workers} {backend} embedding workers ({threads} thread(s) each)...", flush=True)
+        # spawn, not fork: forking a process that already initialised torch can deadlock
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend, threads),
+        )
+
+    def embed(self, texts):
+        """Embed texts across the pool, vectors returned in input order"""
+        futures = [
+            self.executor.submit(_embed_shard, texts[i:i + self.shard_size])
+            for i in range(0, len(texts), self.shard_size)
+        ]
+        vectors = []
+        for future in futures:
+            vectors.extend(future.result())
+        return vectors
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def store_embedded_batch(vectorstore, docs, ids, vectors):
+    """Bulk upsert pre-computed vectors into a LangChain Chroma store"""
+    vectorstore._collection.upsert(
+        ids=ids,
+        embeddings=vectors,
+        documents=[doc.page_content for doc in docs],
+        metadatas=[doc.metadata for doc in docs],
+    )
+
+def add_batch(vectorstore, docs, ids, pool=None):
+    """
+    Embed and store one batch, through the pool when there is one.
+
+    Returns throughput in chunks/s for the batch.
+    """
+    start_time = time.time()
+    if pool is None:
+        vectorstore.add_documents(docs, ids=ids)
+    else:
+        vectors = pool.embed([doc.page_content for doc in docs])
+        store_embedded_batch(vectorstore, docs, ids, vectors)
+    elapsed = time.time() - start_time
+    return len(docs) / elapsed if elapsed > 0 else float("inf")
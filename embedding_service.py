@@ -0,0 +1,476 @@
+"""
+Local embedding daemon shared over a Unix socket
+
+The bot, build_vector_db.py and the test/demo scripts each used to load
+all-MiniLM-L6-v2 themselves, paying the torch import and the model's RAM
+every time. Run the model once instead:
+
+    python embedding_service.py            # start the daemon
+    python embedding_service.py --stats    # throughput / queue depth of a running daemon
+
+get_shared_embeddings() returns an Embeddings that talks to the daemon when
+it is running (and serves the same EMBEDDING_BACKEND), otherwise it loads
+the model in-process exactly as before - so nothing needs the daemon. If the
+daemon goes away mid-run, the client switches to a local model too.
+
+The daemon micro-batches: texts from concurrent requests that arrive within
+EMBEDDING_BATCH_WAIT_MS of each other (up to EMBEDDING_MAX_BATCH texts) go
+through the model in one forward pass, and each caller gets its own slice.
+A request larger than that (an index build) is embedded EMBEDDING_MAX_BATCH
+texts at a time, and every forward pass takes its texts round-robin from all
+waiting requests, so a bot query never waits behind a whole build.
+
+A request that times out is retried (the daemon is busy, not gone); the
+daemon drops the abandoned request as soon as its connection closes, so a
+retry never doubles its load. Only a refused or broken connection switches
+the client to a local model.
+
+Wire format, both directions: 4-byte JSON length, 4-byte payload length, the
+JSON header, then the payload (vectors as little-endian float32).
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import signal
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_backend import EMBEDDING_MODEL, embedding_backend_name, get_embeddings
+
+EMBEDDING_SOCKET = os.getenv("EMBEDDING_SOCKET", "/tmp/biblestudyai-embeddings.sock")
+EMBEDDING_SERVICE = os.getenv("EMBEDDING_SERVICE", "auto").lower()  # "auto" or "off" (always in-process)
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "64"))
+EMBEDDING_STATS_INTERVAL = 60.0
+CONNECT_TIMEOUT = 1.0
+REQUEST_TIMEOUT = 300.0  # A full index build sends thousands of chunks per request
+REQUEST_RETRIES = 2  # Extra attempts after a timeout before the error reaches the caller
+
+FRAME_HEADER = struct.Struct("!II")
+
+# Framing
+
+def encode_frame(header, payload=b""):
+    body = json.dumps(header).encode("utf-8")
+    return FRAME_HEADER.pack(len(body), len(payload)) + body + payload
+
+def _recv_exactly(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("embedding daemon closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+def recv_frame(sock):
+    json_len, payload_len = FRAME_HEADER.unpack(_recv_exactly(sock, FRAME_HEADER.size))
+    header = json.loads(_recv_exactly(sock, json_len))
+    payload = _recv_exactly(sock, payload_len) if payload_len else b""
+    return header, payload
+
+async def read_frame(reader):
+    json_len, payload_len = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    header = json.loads(await reader.readexactly(json_len))
+    payload = await reader.readexactly(payload_len) if payload_len else b""
+    return header, payload
+
+# Daemon
+
+class _EmbedJob:
+    """One request's texts, embedded a slice at a time"""
+
+    def __init__(self, texts, future):
+        self.texts = texts
+        self.future = future
+        self.taken = 0  # Texts handed to a forward pass so far
+        self.parts = []  # Vector slices in order
+
+    def remaining(self):
+        return len(self.texts) - self.taken
+
+class EmbeddingDaemon:
+    """Unix-socket server batching concurrent embed requests into single model calls"""
+
+    def __init__(self, embeddings, backend, path=EMBEDDING_SOCKET,
+                 max_batch=EMBEDDING_MAX_BATCH, batch_wait=EMBEDDING_BATCH_WAIT_MS / 1000):
+        self.embeddings = embeddings
+        self.backend = backend
+        self.path = path
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")  # One forward pass at a time
+        self.jobs = deque()  # Waiting _EmbedJob requests, served round-robin
+        self._arrived = None  # asyncio.Event, created in serve()
+        self.started_at = time.time()
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.clients = 0
+        self._latencies = deque(maxlen=1000)  # Recent request durations (seconds)
+        self._recent = deque()  # (finished_at, texts) over the last minute, for current throughput
+
+    def queue_depth(self):
+        return len(self.jobs)
+
+    async def embed(self, texts):
+        if self._arrived is None:
+            self._arrived = asyncio.Event()
+        future = asyncio.get_running_loop().create_future()
+        job = _EmbedJob(texts, future)
+        self.jobs.append(job)
+        self.max_queue_depth = max(self.max_queue_depth, len(self.jobs))
+        self._arrived.set()
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Caller went away: its remaining slices never reach the model
+            if job in self.jobs:
+                self.jobs.remove(job)
+            raise
+
+    async def _embed_for(self, texts, next_frame):
+        """
+        self.embed(texts), cancelled if the client disconnects first.
+
+        The client reads nothing while it waits, so next_frame (the read of its
+        next request) only finishes early on EOF - e.g. a client that timed out
+        and will resend on a new connection. Returns None in that case.
+        """
+        job = asyncio.ensure_future(self.embed(texts))
+        await asyncio.wait({job, next_frame}, return_when=asyncio.FIRST_COMPLETED)
+        if not job.done() and next_frame.done() and next_frame.exception() is not None:
+            job.cancel()
+            print(f"⚠️ Embedding client disconnected - dropped its request of {len(texts)} texts", flush=True)
+            return None
+        return await job
+
+    def _pending_texts(self):
+        return sum(job.remaining() for job in self.jobs)
+
+    def _next_batch(self):
+        """Up to max_batch (job, start, end) slices, taken round-robin from the waiting requests"""
+        active = [job for job in self.jobs if job.remaining()]
+        share = max(1, self.max_batch // max(1, len(active)))
+        batch = []
+        capacity = self.max_batch
+        while capacity and active:
+            for job in active:
+                n = min(share, capacity, job.remaining())
+                batch.append((job, job.taken, job.taken + n))
+                job.taken += n
+                capacity -= n
+                if not capacity:
+                    break
+            active = [job for job in active if job.remaining()]
+        self.jobs.rotate(-1)  # The next pass starts with another request
+        return batch
+
+    async def _batcher(self):
+        loop = asyncio.get_running_loop()
+        if self._arrived is None:
+            self._arrived = asyncio.Event()
+        while True:
+            while not self._pending_texts():
+                self._arrived.clear()
+                await self._arrived.wait()
+            # A small backlog waits batch_wait for concurrent callers to join the pass
+            deadline = loop.time() + self.batch_wait
+            while self._pending_texts() < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                self._arrived.clear()
+                try:
+                    await asyncio.wait_for(self._arrived.wait(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            batch = self._next_batch()
+            texts = [text for job, start, end in batch for text in job.texts[start:end]]
+            try:
+                vectors = await loop.run_in_executor(self.executor, self.embeddings.embed_documents, texts)
+                vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), -1)
+            except Exception as e:
+                print(f"❌ Embedding batch of {len(texts)} texts failed: {e}", flush=True)
+                for job, _, _ in batch:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                    if job in self.jobs:
+                        self.jobs.remove(job)
+                continue
+            self.batches += 1
+            offset = 0
+            for job, start, end in batch:
+                job.parts.append(vectors[offset:offset + end - start])
+                offset += end - start
+                if job.taken == len(job.texts) and sum(len(part) for part in job.parts) == len(job.texts):
+                    if not job.future.done():
+                        job.future.set_result(np.concatenate(job.parts))
+                    if job in self.jobs:
+                        self.jobs.remove(job)
+
+    async def _handle_client(self, reader, writer):
+        self.clients += 1
+        next_frame = asyncio.ensure_future(read_frame(reader))
+        try:
+            while True:
+                try:
+                    header, _ = await next_frame
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                next_frame = asyncio.ensure_future(read_frame(reader))
+                op = header.get("op")
+                if op == "embed":
+                    started_at = time.perf_counter()
+                    texts = header.get("texts") or []
+                    try:
+                        vectors = await self._embed_for(texts, next_frame) if texts else np.zeros((0, 0), dtype=np.float32)
+                    except Exception as e:
+                        writer.write(encode_frame({"ok": False, "error": str(e)}))
+                    else:
+                        if vectors is None:
+                            break
+                        self._record(len(texts), time.perf_counter() - started_at)
+                        writer.write(encode_frame(
+                            {"ok": True, "n": int(vectors.shape[0]), "dim": int(vectors.shape[1]) if vectors.size else 0},
+                            vectors.astype("<f4").tobytes(),
+                        ))
+                elif op == "info":
+                    writer.write(encode_frame({"ok": True, "backend": self.backend, "model": EMBEDDING_MODEL, "pid": os.getpid()}))
+                elif op == "stats":
+                    writer.write(encode_frame({"ok": True, "stats": self.stats()}))
+                else:
+                    writer.write(encode_frame({"ok": False, "error": f"unknown op {op!r}"}))
+                await writer.drain()
+        except Exception as e:
+            print(f"⚠️ Embedding client error: {e}", flush=True)
+        finally:
+            if not next_frame.done():
+                next_frame.cancel()
+            elif not next_frame.cancelled():
+                next_frame.exception()  # Retrieved: EOF is the normal end of a connection
+            self.clients -= 1
+            writer.close()
+
+    def _record(self, n_texts, seconds):
+        now = time.time()
+        self.requests += 1
+        self.texts += n_texts
+        self._latencies.append(seconds)
+        self._recent.append((now, n_texts))
+        while self._recent and now - self._recent[0][0] > 60:
+            self._recent.popleft()
+
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self):
+        uptime = time.time() - self.started_at
+        return {
+            "backend": self.backend,
+            "uptime_s": round(uptime),
+            "clients": self.clients,
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "avg_batch_texts": round(self.texts / self.batches, 1) if self.batches else 0.0,
+            "texts_per_s": round(self.texts / uptime, 1) if uptime else 0.0,
+            "texts_per_s_last_min": round(sum(n for _, n in self._recent) / 60, 1),
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "latency_p50_ms": round(self._percentile(self._latencies, 0.5) * 1000, 1),
+            "latency_p95_ms": round(self._percentile(self._latencies, 0.95) * 1000, 1),
+        }
+
+    async def _report(self):
+        last_requests = 0
+        while True:
+            await asyncio.sleep(EMBEDDING_STATS_INTERVAL)
+            if self.requests != last_requests:
+                last_requests = self.requests
+                print(f"📊 Embedding daemon: {self.stats()}", flush=True)
+
+    async def serve(self):
+        self._arrived = asyncio.Event()
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Stale socket from a previous run (a live daemon was ruled out in main())
+        server = await asyncio.start_unix_server(self._handle_client, path=self.path)
+        os.chmod(self.path, 0o660)
+        tasks = [asyncio.create_task(self._batcher()), asyncio.create_task(self._report())]
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        print(f"✅ Embedding daemon listening on {self.path} ({self.backend} backend, batches ≤{self.max_batch} texts, {self.batch_wait * 1000:.0f}ms window)", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for task in tasks:
+                task.cancel()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+# Client
+
+class EmbeddingServiceError(RuntimeError):
+    pass
+
+class EmbeddingServiceClient:
+    """Blocking client, one connection per thread so concurrent callers can be batched together"""
+
+    def __init__(self, path=EMBEDDING_SOCKET, timeout=REQUEST_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None and self._local.pid == os.getpid():
+            return sock
+        # New thread, or a forked worker that must not share the parent's socket
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        sock.settimeout(self.timeout)
+        self._local.sock = sock
+        self._local.pid = os.getpid()
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def request(self, header):
+        try:
+            sock = self._connection()
+            sock.sendall(encode_frame(header))
+            response, payload = recv_frame(sock)
+        except (OSError, ConnectionError, struct.error, ValueError):
+            self._drop_connection()
+            raise
+        if not response.get("ok"):
+            raise EmbeddingServiceError(response.get("error", "embedding daemon error"))
+        return response, payload
+
+    def embed(self, texts):
+        response, payload = self.request({"op": "embed", "texts": texts})
+        if not response["n"]:
+            return []
+        return np.frombuffer(payload, dtype="<f4").reshape(response["n"], response["dim"]).tolist()
+
+    def info(self):
+        return self.request({"op": "info"})[0]
+
+    def stats(self):
+        return self.request({"op": "stats"})[0]["stats"]
+
+class ServiceEmbeddings(Embeddings):
+    """Embeddings served by the daemon, falling back to an in-process model if it goes away"""
+
+    def __init__(self, client, backend, num_threads=None):
+        self.client = client
+        self.backend = backend
+        self.num_threads = num_threads
+        self._local_model = None
+        self._lock = threading.Lock()
+
+    def _fallback(self):
+        with self._lock:
+            if self._local_model is None:
+                print(f"⚠️ Embedding daemon unavailable - loading the {self.backend} model in-process", flush=True)
+                self._local_model = get_embeddings(self.backend, num_threads=self.num_threads)
+        return self._local_model
+
+    def embed_documents(self, texts):
+        if self._local_model is None:
+            reconnected = False
+            for attempt in range(REQUEST_RETRIES + 1):
+                try:
+                    return self.client.embed(texts)
+                except TimeoutError:
+                    # Busy (e.g. behind an index build), not gone: retry on a fresh connection
+                    if attempt == REQUEST_RETRIES:
+                        raise
+                    print(f"⚠️ Embedding daemon timed out - retrying ({attempt + 1}/{REQUEST_RETRIES})", flush=True)
+                except (OSError, ConnectionError):
+                    # One reconnect covers a daemon restart; after that it is really gone
+                    if reconnected:
+                        break
+                    reconnected = True
+        return self._fallback().embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def served_by_daemon(embeddings):
+    """True if embeddings (or the query cache wrapping them) go through the daemon"""
+    return isinstance(getattr(embeddings, "embeddings", embeddings), ServiceEmbeddings)
+
+def get_shared_embeddings(backend=None, path=EMBEDDING_SOCKET, num_threads=None):
+    """The daemon's embeddings if one is running with this backend, else an in-process model"""
+    backend = backend or embedding_backend_name()
+    if EMBEDDING_SERVICE != "off" and os.path.exists(path):
+        client = EmbeddingServiceClient(path)
+        try:
+            info = client.info()
+        except (OSError, ConnectionError, EmbeddingServiceError) as e:
+            print(f"   ⚠️ Embedding daemon at {path} not answering ({e}) - using an in-process model", flush=True)
+        else:
+            if info.get("backend") == backend and info.get("model") == EMBEDDING_MODEL:
+                print(f"   ✅ Using embedding daemon at {path} (pid {info.get('pid')}, {backend} backend)", flush=True)
+                return ServiceEmbeddings(client, backend, num_threads)
+            print(f"   ⚠️ Embedding daemon serves {info.get('backend')} / {info.get('model')}, need {backend} - using an in-process model", flush=True)
+    return get_embeddings(backend, num_threads=num_threads)
+
+def main():
+    if "--stats" in sys.argv:
+        try:
+            stats = EmbeddingServiceClient(EMBEDDING_SOCKET, timeout=10).stats()
+        except (OSError, ConnectionError) as e:
+            print(f"❌ No embedding daemon at {EMBEDDING_SOCKET}: {e}")
+            sys.exit(1)
+        for key, value in stats.items():
+            print(f"   {key}: {value}")
+        return
+
+    try:
+        EmbeddingServiceClient(EMBEDDING_SOCKET, timeout=5).info()
+        print(f"❌ An embedding daemon is already listening on {EMBEDDING_SOCKET}")
+        sys.exit(1)
+    except (OSError, ConnectionError):
+        pass
+
+    backend = embedding_backend_name()
+    print(f"🧠 Loading embeddings model ({backend} backend)...", flush=True)
+    start_time = time.time()
+    embeddings = get_embeddings(backend)
+    embeddings.embed_documents(["warm-up"])
+    print(f"   ✅ Model ready in {time.time() - start_time:.1f}s", flush=True)
+    daemon = EmbeddingDaemon(embeddings, backend)
+    try:
+        asyncio.run(daemon.serve())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        print(f"\n👋 Embedding daemon stopped: {daemon.stats()}", flush=True)
+
+if __name__ == "__main__":
+    main()
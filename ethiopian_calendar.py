@@ -0,0 +1,193 @@
+"""
+Ethiopian calendar conversion and Synaxarium day index
+
+The Synaxarium is organised by Ethiopian months (Meskerem ... Pagume), so the
+Saint of the Day is found by converting today's Gregorian date and looking the
+(month, day) up in an index built once from the Synaxarium sources - no
+embedding or vector search involved.
+
+Calendar: 12 months of 30 days + Pagume (5 days, 6 in the year before a
+Gregorian leap year, i.e. Ethiopian year % 4 == 3). Conversion goes through
+the Julian Day Number with the Amete Mihret epoch.
+"""
+
+import os
+import re
+import json
+import hashlib
+from datetime import date
+
+ETHIOPIAN_MONTHS = [
+    "Meskerem", "Tikimt", "Hidar", "Tahsas", "Tir", "Yekatit", "Megabit",
+    "Miyazya", "Ginbot", "Sene", "Hamle", "Nehase", "Pagume",
+]
+
+# Spellings seen in English translations of the Synaxarium
+MONTH_ALIASES = {
+    1: ["meskerem", "maskaram", "meskeram"],
+    2: ["tikimt", "tekemt", "tikemt", "teqemt", "tiqimt", "tekimt"],
+    3: ["hidar", "hedar", "khidar"],
+    4: ["tahsas", "tahesas", "tahisas", "takhsas"],
+    5: ["tir", "ter", "tirr"],
+    6: ["yekatit", "yakatit"],
+    7: ["megabit", "magabit", "megabeet"],
+    8: ["miyazya", "miyaziya", "miazia", "miyazia"],
+    9: ["ginbot", "genbot", "ginbet"],
+    10: ["sene", "sane", "senie"],
+    11: ["hamle", "hamlie", "hamley"],
+    12: ["nehase", "nahase", "nehasie"],
+    13: ["pagume", "pagumen", "paguemen", "pagumien", "quagume"],
+}
+MONTH_BY_NAME = {alias: month for month, aliases in MONTH_ALIASES.items() for alias in aliases}
+
+JD_EPOCH_AMETE_MIHRET = 1723856
+JD_ORDINAL_OFFSET = 1721425  # date.toordinal() + this = Julian Day Number
+
+SYNAXARIUM_INDEX_PATH = os.getenv("SYNAXARIUM_INDEX_PATH", "./synaxarium_index.json")
+SYNAXARIUM_INDEX_VERSION = 2  # Bump when parse_heading changes, so persisted indexes are rebuilt
+MAX_HEADING_LENGTH = 80
+
+def ethiopian_to_jdn(year, month, day):
+    return (JD_EPOCH_AMETE_MIHRET + 365) + 365 * (year - 1) + year // 4 + 30 * month + day - 31
+
+def jdn_to_ethiopian(jdn):
+    r = (jdn - JD_EPOCH_AMETE_MIHRET) % 1461
+    n = (r % 365) + 365 * (r // 1460)
+    year = 4 * ((jdn - JD_EPOCH_AMETE_MIHRET) // 1461) + r // 365 - r // 1460
+    return year, n // 30 + 1, n % 30 + 1
+
+def gregorian_to_ethiopian(gregorian_date):
+    """(year, month, day) in the Ethiopian calendar for a datetime.date"""
+    return jdn_to_ethiopian(gregorian_date.toordinal() + JD_ORDINAL_OFFSET)
+
+def ethiopian_to_gregorian(year, month, day):
+    return date.fromordinal(ethiopian_to_jdn(year, month, day) - JD_ORDINAL_OFFSET)
+
+def is_ethiopian_leap_year(year):
+    return year % 4 == 3
+
+def format_ethiopian_date(year, month, day, with_year=True):
+    label = f"{ETHIOPIAN_MONTHS[month - 1]} {day}"
+    return f"{label}, {year} E.C." if with_year else label
+
+_MONTH_PATTERN = "|".join(sorted(MONTH_BY_NAME, key=len, reverse=True))
+_MONTH_DAY = rf"(?P<month>{_MONTH_PATTERN})\s+(?P<day>\d{{1,2}})(?:st|nd|rd|th)?"
+_DAY_MONTH = rf"(?:day\s+)?(?P<day>\d{{1,2}})(?:st|nd|rd|th)?\s+(?:day\s+)?(?:of\s+)?(?P<month>{_MONTH_PATTERN})"
+# A heading is either a whole line that is just the date ("MESKEREM 1", "Tikimt 17:",
+# "**1 Meskerem**", "17th day of Tikimt") or a markdown heading that starts with
+# one ("## Meskerem 1st - St. John"). Prose that happens to start with a month
+# name and a number ("Sane 5 people came ...") is not a heading.
+HEADING_PATTERNS = [
+    re.compile(rf"^[\s*_=~-]*{date_pattern}[\s*_:.=~-]*$", re.IGNORECASE)
+    for date_pattern in (_MONTH_DAY, _DAY_MONTH)
+] + [
+    re.compile(rf"^#{{1,6}}\s+[*_]*{date_pattern}\b", re.IGNORECASE)
+    for date_pattern in (_MONTH_DAY, _DAY_MONTH)
+]
+
+def parse_heading(line):
+    """(month, day) if the line is a Synaxarium day heading, else None"""
+    line = line.strip()
+    if not line or len(line) > MAX_HEADING_LENGTH:
+        return None
+    for pattern in HEADING_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            month, day = MONTH_BY_NAME[match.group("month").lower()], int(match.group("day"))
+            if 1 <= day <= (6 if month == 13 else 30):
+                return month, day
+            return None
+    return None
+
+def segment_synaxarium(text):
+    """Split the Synaxarium into {(month, day): entry text}; repeated headings are appended"""
+    entries = {}
+    current, lines = None, []
+
+    def flush():
+        if current is not None and any(l.strip() for l in lines):
+            body = "\n".join(lines).strip()
+            entries[current] = f"{entries[current]}\n\n{body}" if current in entries else body
+
+    for line in text.splitlines():
+        heading = parse_heading(line)
+        if heading is not None:
+            flush()
+            current, lines = heading, [line.strip()]
+        else:
+            lines.append(line)
+    flush()
+    return entries
+
+class SynaxariumIndex:
+    """Persisted (Ethiopian month, day) → Synaxarium entry table"""
+
+    def __init__(self, entries, source_sha256=None):
+        self.entries = entries
+        self.source_sha256 = source_sha256
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, month, day):
+        return self.entries.get((month, day))
+
+    def for_gregorian_date(self, gregorian_date):
+        """(ethiopian (year, month, day), entry text or None)"""
+        year, month, day = gregorian_to_ethiopian(gregorian_date)
+        return (year, month, day), self.lookup(month, day)
+
+    def save(self, path=SYNAXARIUM_INDEX_PATH):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "version": SYNAXARIUM_INDEX_VERSION,
+                "source_sha256": self.source_sha256,
+                "entries": {f"{m}-{d}": text for (m, d), text in sorted(self.entries.items())},
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=SYNAXARIUM_INDEX_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") != SYNAXARIUM_INDEX_VERSION:
+            raise ValueError(f"Synaxarium index version {data.get('version')}, expected {SYNAXARIUM_INDEX_VERSION}")
+        entries = {tuple(int(x) for x in key.split("-")): text for key, text in data["entries"].items()}
+        return cls(entries, data.get("source_sha256"))
+
+    @classmethod
+    def build(cls, synaxarium_paths):
+        """Segment every Synaxarium source file (in order) into one index"""
+        entries = {}
+        digest = hashlib.sha256()
+        for path in synaxarium_paths:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            digest.update(raw)
+            for key, text in segment_synaxarium(raw.decode("utf-8", errors="replace")).items():
+                entries[key] = f"{entries[key]}\n\n{text}" if key in entries else text
+        return cls(entries, digest.hexdigest())
+
+def sources_sha256(paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def load_or_build_synaxarium_index(synaxarium_paths, index_path=SYNAXARIUM_INDEX_PATH):
+    """Reuse the persisted index unless the Synaxarium files changed; None if there are none"""
+    synaxarium_paths = [p for p in synaxarium_paths if os.path.exists(p)]
+    if not synaxarium_paths:
+        return None
+    if os.path.exists(index_path):
+        try:
+            index = SynaxariumIndex.load(index_path)
+            if index.source_sha256 == sources_sha256(synaxarium_paths):
+                return index
+        except (OSError, ValueError, KeyError):
+            pass
+    index = SynaxariumIndex.build(synaxarium_paths)
+    index.save(index_path)
+    return index
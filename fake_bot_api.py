@@ -0,0 +1,171 @@
+"""
+Local fake of the Telegram Bot API, for end-to-end runs without Telegram
+
+Answers the methods the bot calls (getMe, setWebhook, sendMessage,
+editMessageText, sendChatAction, answerInlineQuery, getUpdates, ...) and
+records every call, so a webhook or polling run can be checked without a
+token or network access:
+
+    python fake_bot_api.py 18081
+    TELEGRAM_API_BASE_URL=http://127.0.0.1:18081/bot TELEGRAM_BOT_TOKEN=123:abc python telegram_bot.py
+
+Updates queued with push_update() are handed out by getUpdates (polling
+mode); in webhook mode post them to the bot's webhook URL instead.
+"""
+
+import sys
+import json
+import time
+import asyncio
+from urllib.parse import parse_qsl
+import tornado.web
+import tornado.httpserver
+from tornado.netutil import bind_sockets
+
+FAKE_BOT_USER = {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+GET_UPDATES_MAX_WAIT = 1.0
+
+class FakeBotAPI:
+    """Records Bot API calls and answers them with minimal valid results"""
+
+    def __init__(self, port=0, host="127.0.0.1"):
+        self.host = host
+        self.port = port
+        self.calls = []  # (method, params) in arrival order
+        self.webhook_url = None
+        self._updates = []
+        self._next_message_id = 1
+        self._server = None
+        self._changed = None  # asyncio.Event, set on every call / pushed update
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self):
+        self._changed = asyncio.Event()
+        sockets = bind_sockets(self.port, self.host)
+        self.port = sockets[0].getsockname()[1]
+        app = tornado.web.Application([(r"/bot[^/]+/(\w+)", _MethodHandler, {"api": self})])
+        self._server = tornado.httpserver.HTTPServer(app)
+        self._server.add_sockets(sockets)
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.stop()
+            await self._server.close_all_connections()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def push_update(self, update):
+        """Queue an update for getUpdates (polling mode)"""
+        self._updates.append(update)
+        self._notify()
+
+    def calls_to(self, method):
+        return [params for name, params in self.calls if name == method]
+
+    async def wait_for(self, method, count=1, timeout=5.0):
+        """Wait until method has been called count times; returns those calls' params"""
+        deadline = time.monotonic() + timeout
+        while len(self.calls_to(method)) < count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"{method} called {len(self.calls_to(method))} times, expected {count}")
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+        return self.calls_to(method)[:count]
+
+    def _message(self, params, text=None):
+        chat_id = int(params.get("chat_id", 0))
+        message_id = params.get("message_id")
+        if message_id is None:
+            message_id = self._next_message_id
+            self._next_message_id += 1
+        return {
+            "message_id": int(message_id),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+            "from": FAKE_BOT_USER,
+            "text": text if text is not None else params.get("text", ""),
+        }
+
+    async def handle(self, method, params):
+        self.calls.append((method, params))
+        self._notify()
+        if method == "getMe":
+            return FAKE_BOT_USER
+        if method == "getUpdates":
+            offset = int(params.get("offset", 0) or 0)
+            self._updates = [u for u in self._updates if u["update_id"] >= offset]
+            if not self._updates:
+                wait = min(float(params.get("timeout", 0) or 0), GET_UPDATES_MAX_WAIT)
+                try:
+                    await asyncio.wait_for(self._changed.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            return list(self._updates)
+        if method == "setWebhook":
+            self.webhook_url = params.get("url")
+            return True
+        if method == "deleteWebhook":
+            self.webhook_url = None
+            return True
+        if method == "getWebhookInfo":
+            return {"url": self.webhook_url or "", "has_custom_certificate": False, "pending_update_count": 0}
+        if method in ("sendMessage", "editMessageText"):
+            return self._message(params)
+        return True  # sendChatAction, answerInlineQuery, setMyCommands, ...
+
+class _MethodHandler(tornado.web.RequestHandler):
+    def initialize(self, api):
+        self.api = api
+
+    def _params(self):
+        content_type = self.request.headers.get("Content-Type", "")
+        if "application/json" in content_type:
+            return json.loads(self.request.body or b"{}")
+        if "multipart/form-data" in content_type:
+            return {key: values[0].decode("utf-8") for key, values in self.request.body_arguments.items()}
+        params = dict(parse_qsl(self.request.body.decode("utf-8")))
+        params.update({key: values[0].decode("utf-8") for key, values in self.request.query_arguments.items()})
+        return params
+
+    async def _answer(self, method):
+        result = await self.api.handle(method, self._params())
+        self.set_header("Content-Type", "application/json")
+        self.write(json.dumps({"ok": True, "result": result}))
+
+    async def post(self, method):
+        await self._answer(method)
+
+    async def get(self, method):
+        await self._answer(method)
+
+async def _serve_forever(port):
+    api = await FakeBotAPI(port).start()
+    print(f"🧪 Fake Bot API on {api.base_url} (TELEGRAM_API_BASE_URL)", flush=True)
+    seen = 0
+    while True:
+        await asyncio.sleep(0.2)
+        for method, params in api.calls[seen:]:
+            if method != "getUpdates":
+                print(f"   → {method} {json.dumps(params, ensure_ascii=False)[:200]}", flush=True)
+        seen = len(api.calls)
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_serve_forever(int(sys.argv[1]) if len(sys.argv) > 1 else 18081))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,154 @@
+"""
+Hybrid BM25 + vector retrieval over the chunks in chroma_db_bot
+
+Saint names, Ge'ez terms (Tasbeha, Qene, Kidase) and dates like "Meskerem 17"
+are exact-token lookups that dense MiniLM similarity over 3000-char chunks
+handles poorly. BM25Index is an in-memory inverted index over the same chunks
+as the Chroma collection; HybridRetriever fuses its ranking with the vector
+ranking (reciprocal rank fusion) and answers short keyword-only queries from
+the lexical index alone, without touching the embedding model.
+"""
+
+import re
+import math
+import numpy as np
+from typing import Any, Dict, List, Optional
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Words that mark a natural-language question rather than a keyword lookup
+QUESTION_WORDS = {
+    "who", "what", "when", "where", "why", "how", "which", "is", "are", "was",
+    "were", "do", "does", "did", "can", "tell", "me", "about", "explain", "the",
+    "a", "an", "of", "in", "on", "to", "and", "or", "please", "i", "you",
+}
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of chunks, with per-posting weights precomputed"""
+
+    def __init__(self, ids, texts, metadatas, k1=1.5, b=0.75):
+        self.ids = ids
+        self.texts = texts
+        self.metadatas = metadatas
+        self._masks = {}
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        term_postings = {}
+        for doc_idx, text in enumerate(texts):
+            counts = {}
+            for token in tokenize(text):
+                counts[token] = counts.get(token, 0) + 1
+            lengths[doc_idx] = sum(counts.values())
+            for token, tf in counts.items():
+                term_postings.setdefault(token, []).append((doc_idx, tf))
+
+        avg_length = float(lengths.mean()) if len(texts) else 0.0
+        n_docs = len(texts)
+        self.postings = {}
+        for token, postings in term_postings.items():
+            doc_idxs = np.fromiter((p[0] for p in postings), dtype=np.int32, count=len(postings))
+            tfs = np.fromiter((p[1] for p in postings), dtype=np.float32, count=len(postings))
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            norm = k1 * (1 - b + b * lengths[doc_idxs] / max(avg_length, 1e-9))
+            self.postings[token] = (doc_idxs, (idf * tfs * (k1 + 1) / (tfs + norm)).astype(np.float32))
+
+    @classmethod
+    def from_chroma(cls, vectorstore, page_size=5000):
+        """Build from every chunk in a LangChain Chroma store"""
+        collection = vectorstore._collection
+        ids, texts, metadatas = [], [], []
+        offset = 0
+        while True:
+            page = collection.get(include=["documents", "metadatas"], limit=page_size, offset=offset)
+            if not page["ids"]:
+                break
+            ids.extend(page["ids"])
+            texts.extend(page["documents"])
+            metadatas.extend(m or {} for m in page["metadatas"])
+            offset += len(page["ids"])
+        return cls(ids, texts, metadatas)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def has_terms(self, tokens):
+        return all(token in self.postings for token in tokens)
+
+    def _filter_mask(self, filter):
+        key = tuple(sorted(filter.items()))
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (all(metadata.get(k) == v for k, v in filter.items()) for metadata in self.metadatas),
+                dtype=bool, count=len(self.metadatas),
+            )
+            self._masks[key] = mask
+        return mask
+
+    def search(self, query, k=3, filter=None):
+        """Top-k (doc_idx, score) for the query, optionally restricted to matching metadata"""
+        scores = np.zeros(len(self.texts), dtype=np.float32)
+        matched = False
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if posting is not None:
+                scores[posting[0]] += posting[1]  # Doc indexes are unique within a posting list
+                matched = True
+        if not matched:
+            return []
+        if filter:
+            scores[~self._filter_mask(filter)] = 0.0
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(doc_idx), float(scores[doc_idx])) for doc_idx in top if scores[doc_idx] > 0]
+
+    def document(self, doc_idx):
+        return Document(page_content=self.texts[doc_idx], metadata=dict(self.metadatas[doc_idx]), id=self.ids[doc_idx])
+
+def is_keyword_query(tokens, max_tokens=3):
+    """Short query of names/terms only, e.g. "Tasbeha" or "Meskerem 17" """
+    return 0 < len(tokens) <= max_tokens and not any(token in QUESTION_WORDS for token in tokens)
+
+class HybridRetriever(BaseRetriever):
+    """Reciprocal-rank fusion of BM25 and vector search, lexical-only for keyword queries"""
+
+    vectorstore: Any
+    bm25: Any
+    k: int = 3
+    fetch_k: int = 10
+    rrf_k: int = 60  # Standard RRF damping constant
+    search_filter: Optional[Dict[str, Any]] = None
+
+    def search(self, query, k=None, filter=None):
+        k = k or self.k
+        filter = filter or self.search_filter
+        tokens = tokenize(query)
+
+        # Keyword lookup fully covered by the index: answer lexically, no embedding at all
+        if is_keyword_query(tokens) and self.bm25.has_terms(tokens):
+            lexical = self.bm25.search(query, k=k, filter=filter)
+            if lexical:
+                return [self.bm25.document(doc_idx) for doc_idx, _ in lexical]
+
+        vector_docs = self.vectorstore.similarity_search(query, k=self.fetch_k, filter=filter)
+        lexical = self.bm25.search(query, k=self.fetch_k, filter=filter)
+
+        fused = {}
+        for rank, doc in enumerate(vector_docs):
+            entry = fused.setdefault(doc.page_content, [0.0, doc])
+            entry[0] += 1.0 / (self.rrf_k + rank + 1)
+        for rank, (doc_idx, _) in enumerate(lexical):
+            entry = fused.setdefault(self.bm25.texts[doc_idx], [0.0, None])
+            entry[0] += 1.0 / (self.rrf_k + rank + 1)
+            if entry[1] is None:
+                entry[1] = self.bm25.document(doc_idx)
+        ranked = sorted(fused.values(), key=lambda entry: entry[0], reverse=True)
+        return [doc for _, doc in ranked[:k]]
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.search(query)
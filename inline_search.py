@@ -0,0 +1,101 @@
+"""
+Debounced inline search on a dedicated executor
+
+Inline mode sends an update for nearly every keystroke. Each user gets at
+most one pending search: a new query cancels the previous one (while it is
+still debouncing, or discards its result if it is already running) and
+starts its own after INLINE_DEBOUNCE_SECONDS of quiet. Searches run on their
+own small thread pool, so neither the event loop nor the default executor
+used by other handlers ever waits on retrieval.
+
+Per-user state lives in a bounded LRU table whose entries expire after
+INLINE_STATE_TTL seconds, instead of a dict that grows with every user.
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+INLINE_SEARCH_WORKERS = int(os.getenv("INLINE_SEARCH_WORKERS", "2"))
+INLINE_DEBOUNCE_SECONDS = float(os.getenv("INLINE_DEBOUNCE_SECONDS", "0.3"))
+INLINE_STATE_SIZE = int(os.getenv("INLINE_STATE_SIZE", "10000"))
+INLINE_STATE_TTL = float(os.getenv("INLINE_STATE_TTL", "600"))
+
+class InlineUserState:
+    __slots__ = ("query", "task", "updated")
+
+    def __init__(self, query, task, updated):
+        self.query = query
+        self.task = task
+        self.updated = updated
+
+class InlineSearchScheduler:
+    """One debounced, cancellable search per user, executed off the event loop"""
+
+    def __init__(self, search_fn, workers=INLINE_SEARCH_WORKERS, debounce=INLINE_DEBOUNCE_SECONDS,
+                 max_users=INLINE_STATE_SIZE, ttl=INLINE_STATE_TTL):
+        self.search_fn = search_fn
+        self.debounce = debounce
+        self.max_users = max_users
+        self.ttl = ttl
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inline-search")
+        self._states = OrderedDict()  # user_id -> InlineUserState, least recently active first
+        self.submitted = 0
+        self.superseded = 0
+        self.completed = 0
+
+    def __len__(self):
+        return len(self._states)
+
+    def _expire(self, now):
+        while self._states:
+            user_id, state = next(iter(self._states.items()))
+            if now - state.updated < self.ttl and len(self._states) <= self.max_users:
+                break
+            self._states.popitem(last=False)
+            if not state.task.done():
+                state.task.cancel()
+
+    def submit(self, user_id, query, on_results):
+        """Schedule a search; on_results(docs, search_seconds) is awaited unless superseded"""
+        now = time.monotonic()
+        previous = self._states.pop(user_id, None)
+        if previous is not None and not previous.task.done():
+            previous.task.cancel()
+            self.superseded += 1
+        task = asyncio.get_running_loop().create_task(self._run(query, on_results))
+        self._states[user_id] = InlineUserState(query, task, now)
+        self.submitted += 1
+        self._expire(now)
+        return task
+
+    def cancel(self, user_id):
+        """Drop a user's pending search (e.g. answered some other way)"""
+        state = self._states.pop(user_id, None)
+        if state is not None and not state.task.done():
+            state.task.cancel()
+            self.superseded += 1
+
+    async def _run(self, query, on_results):
+        await asyncio.sleep(self.debounce)
+        start_time = time.perf_counter()
+        try:
+            docs = await asyncio.get_running_loop().run_in_executor(self.executor, self.search_fn, query)
+            self.completed += 1
+            await on_results(docs, time.perf_counter() - start_time)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Inline search error: {e}", flush=True)
+            import traceback
+            traceback.print_exc()
+
+    def stats(self):
+        return {
+            "users": len(self._states),
+            "submitted": self.submitted,
+            "superseded": self.superseded,
+            "completed": self.completed,
+        }
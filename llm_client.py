@@ -0,0 +1,146 @@
+"""
+Async DeepSeek client with a shared connection pool and a concurrency limit
+
+Every LLM call (chat answers, saint summaries) goes through one AsyncLLM:
+ChatOpenAI.ainvoke over a single keep-alive httpx.AsyncClient, so requests
+reuse TLS connections instead of opening new ones, and nothing blocks the
+event loop while DeepSeek is generating. At most LLM_MAX_IN_FLIGHT requests
+run at once; the rest wait their turn, and the time spent waiting is
+recorded so a saturated limit shows up in the logs. Each request is bounded
+by LLM_TIMEOUT seconds. astream() yields the answer as it is generated, for
+progressively edited Telegram replies.
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+import httpx
+from langchain_openai import ChatOpenAI
+
+LLM_MODEL = "deepseek-chat"
+LLM_BASE_URL = "https://api.deepseek.com"
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_CONNECT_TIMEOUT = 10.0
+LLM_KEEPALIVE_SECONDS = 60.0
+
+class AsyncLLM:
+    """Semaphore-limited ainvoke with timeouts and queue-wait metrics"""
+
+    def __init__(self, api_key, max_in_flight=LLM_MAX_IN_FLIGHT, timeout=LLM_TIMEOUT, transport=None):
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_in_flight,
+                max_keepalive_connections=max_in_flight,
+                keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(timeout, connect=LLM_CONNECT_TIMEOUT),
+            transport=transport,  # None: real network; tests pass an httpx.MockTransport
+        )
+        self.chat = ChatOpenAI(
+            model=LLM_MODEL,
+            api_key=api_key,
+            base_url=LLM_BASE_URL,
+            temperature=0,
+            http_async_client=self.http_client,
+            timeout=timeout,
+        )
+        self._semaphore = None  # Created on first use, inside the bot's event loop
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._waits = deque(maxlen=500)  # Recent queue waits (seconds)
+        self._latencies = deque(maxlen=500)  # Recent request durations (seconds)
+
+    async def _acquire(self):
+        """Wait for an in-flight slot; returns the time the request started"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started_at = time.perf_counter()
+        self._waits.append(started_at - queued_at)
+        self.in_flight += 1
+        self.requests += 1
+        return started_at
+
+    async def ainvoke(self, messages):
+        started_at = await self._acquire()
+        try:
+            return await asyncio.wait_for(self.chat.ainvoke(messages), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._latencies.append(time.perf_counter() - started_at)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def astream(self, messages):
+        """
+        Yield the completion text piece by piece; LLM_TIMEOUT bounds the whole stream.
+
+        The in-flight slot is held until the stream ends: a caller that stops
+        iterating early must aclose() the generator to free it.
+        """
+        started_at = await self._acquire()
+        deadline = started_at + self.timeout
+        stream = None
+        try:
+            stream = self.chat.astream(messages).__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout=max(deadline - time.perf_counter(), 0.001))
+                except StopAsyncIteration:
+                    return
+                if chunk.content:
+                    yield chunk.content
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            try:
+                if stream is not None:
+                    await stream.aclose()
+            finally:
+                self._latencies.append(time.perf_counter() - started_at)
+                self.in_flight -= 1
+                self._semaphore.release()
+
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return 0.0
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "wait_p50_ms": round(self._percentile(self._waits, 0.5) * 1000, 1),
+            "wait_p95_ms": round(self._percentile(self._waits, 0.95) * 1000, 1),
+            "latency_p50_s": round(self._percentile(self._latencies, 0.5), 2),
+            "latency_p95_s": round(self._percentile(self._latencies, 0.95), 2),
+        }
+
+    async def aclose(self):
+        await self.http_client.aclose()
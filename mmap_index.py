@@ -0,0 +1,200 @@
+"""
+Memory-mapped NumPy retrieval engine (alternative to Chroma)
+
+Exports chroma_db_bot into a compact read-only directory:
+
+    embeddings.npy   float16 (N, 384) matrix, L2-normalised, memory-mapped
+    texts.bin        all chunk texts, UTF-8, concatenated
+    offsets.npy      int64 (N+1,) byte offsets into texts.bin
+    meta.json        ids, metadatas and the fingerprint of what was exported
+
+MmapVectorStore is a LangChain VectorStore over that directory, so
+similarity_search(query, k, filter=...) and as_retriever(search_kwargs={"k": 3})
+work as with Chroma. Files are opened with mmap, so loading is near-instant and
+several processes serving the same index share its pages.
+
+Export manually with: python mmap_index.py [chroma_db_bot] [mmap_index]
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+MMAP_INDEX_DIR = os.getenv("MMAP_INDEX_DIR", "./mmap_index")
+SCAN_BLOCK_ROWS = 16384  # float16 rows converted to float32 per matmul block
+
+def chroma_write_position(db_path):
+    """
+    Per-segment max_seq_id rows from chroma.sqlite3, or "" if unreadable.
+
+    Chroma bumps a segment's max_seq_id on every add, update and delete, so this
+    changes with any write to the collection - even one that keeps the chunk
+    count and bypasses the source manifest. (The file's mtime is no use: Chroma
+    rewrites the file each time it opens it.)
+    """
+    sqlite_path = os.path.join(db_path, "chroma.sqlite3")
+    if not os.path.exists(sqlite_path):
+        return ""
+    try:
+        db = sqlite3.connect(f"file:{sqlite_path}?mode=ro", uri=True)
+        try:
+            rows = db.execute("SELECT segment_id, seq_id FROM max_seq_id ORDER BY segment_id").fetchall()
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return ""
+    return ";".join(f"{segment_id}={seq_id}" for segment_id, seq_id in rows)
+
+def chroma_fingerprint(vectorstore, db_path):
+    """Changes whenever the Chroma contents (chunk count, source manifest or write position) change"""
+    digest = hashlib.sha256(str(vectorstore._collection.count()).encode())
+    manifest_path = os.path.join(db_path, "source_manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'rb') as f:
+            digest.update(f.read())
+    digest.update(chroma_write_position(db_path).encode())
+    return digest.hexdigest()
+
+def export_chroma(vectorstore, out_dir=MMAP_INDEX_DIR, fingerprint=None, page_size=5000):
+    """Dump every chunk (vector, text, metadata) of a LangChain Chroma store to out_dir"""
+    start_time = time.time()
+    collection = vectorstore._collection
+    total = collection.count()
+    os.makedirs(out_dir, exist_ok=True)
+
+    ids, metadatas = [], []
+    offsets = [0]
+    matrix = None
+    with open(os.path.join(out_dir, "texts.bin.tmp"), 'wb') as texts_file:
+        offset = 0
+        while offset < total:
+            page = collection.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            if not len(page["ids"]):
+                break
+            vectors = np.asarray(page["embeddings"], dtype=np.float32)
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+            if matrix is None:
+                matrix = np.lib.format.open_memmap(
+                    os.path.join(out_dir, "embeddings.npy.tmp"), mode='w+',
+                    dtype=np.float16, shape=(total, vectors.shape[1]),
+                )
+            matrix[offset:offset + len(vectors)] = vectors.astype(np.float16)
+            for text in page["documents"]:
+                encoded = text.encode("utf-8")
+                texts_file.write(encoded)
+                offsets.append(offsets[-1] + len(encoded))
+            ids.extend(page["ids"])
+            metadatas.extend(m or {} for m in page["metadatas"])
+            offset += len(page["ids"])
+
+    if matrix is None:
+        raise ValueError("Chroma collection is empty - nothing to export")
+    matrix.flush()
+    del matrix
+    with open(os.path.join(out_dir, "offsets.npy.tmp"), 'wb') as f:
+        np.save(f, np.asarray(offsets, dtype=np.int64))
+    with open(os.path.join(out_dir, "meta.json.tmp"), 'w', encoding='utf-8') as f:
+        json.dump({"ids": ids, "metadatas": metadatas, "fingerprint": fingerprint}, f)
+
+    # meta.json goes last: a directory with meta.json is always a complete export
+    os.replace(os.path.join(out_dir, "embeddings.npy.tmp"), os.path.join(out_dir, "embeddings.npy"))
+    os.replace(os.path.join(out_dir, "texts.bin.tmp"), os.path.join(out_dir, "texts.bin"))
+    os.replace(os.path.join(out_dir, "offsets.npy.tmp"), os.path.join(out_dir, "offsets.npy"))
+    os.replace(os.path.join(out_dir, "meta.json.tmp"), os.path.join(out_dir, "meta.json"))
+    size = sum(os.path.getsize(os.path.join(out_dir, name)) for name in ("embeddings.npy", "texts.bin", "offsets.npy", "meta.json"))
+    print(f"   ✅ Exported {len(ids):,} chunks to {out_dir} ({size / (1024*1024):.1f} MB) in {time.time() - start_time:.1f}s", flush=True)
+
+def read_fingerprint(index_dir=MMAP_INDEX_DIR):
+    try:
+        with open(os.path.join(index_dir, "meta.json"), 'r', encoding='utf-8') as f:
+            return json.load(f).get("fingerprint")
+    except (OSError, ValueError):
+        return None
+
+class MmapVectorStore(VectorStore):
+    """Read-only vector store over an exported index, brute-force top-k with NumPy"""
+
+    def __init__(self, index_dir=MMAP_INDEX_DIR, embedding_function=None):
+        self.index_dir = index_dir
+        self._embedding_function = embedding_function
+        self.matrix = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode='r')
+        self.offsets = np.load(os.path.join(index_dir, "offsets.npy"), mmap_mode='r')
+        self.texts = np.memmap(os.path.join(index_dir, "texts.bin"), dtype=np.uint8, mode='r') \
+            if os.path.getsize(os.path.join(index_dir, "texts.bin")) else np.zeros(0, dtype=np.uint8)
+        with open(os.path.join(index_dir, "meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.ids = meta["ids"]
+        self.metadatas = meta["metadatas"]
+        self._masks = {}
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _filter_mask(self, filter):
+        """Boolean row mask for an equality filter like {"source": "synaxarium"}"""
+        key = json.dumps(filter, sort_keys=True)
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (all(metadata.get(k) == v for k, v in filter.items()) for metadata in self.metadatas),
+                dtype=bool, count=len(self.metadatas),
+            )
+            self._masks[key] = mask
+        return mask
+
+    def document(self, row):
+        text = bytes(self.texts[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+        return Document(page_content=text, metadata=dict(self.metadatas[row]), id=self.ids[row])
+
+    def search_by_vector(self, vector, k=4, filter=None):
+        """Top-k (row, cosine) for a query vector"""
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = np.empty(len(self.ids), dtype=np.float32)
+        for start in range(0, len(scores), SCAN_BLOCK_ROWS):
+            block = self.matrix[start:start + SCAN_BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        if filter:
+            scores[~self._filter_mask(filter)] = -np.inf
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(row), float(scores[row])) for row in top if np.isfinite(scores[row])]
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        """Same contract as Chroma: (doc, distance), lower is closer (squared L2 of unit vectors)"""
+        vector = self._embedding_function.embed_query(query)
+        return [(self.document(row), 2.0 - 2.0 * score) for row, score in self.search_by_vector(vector, k, filter)]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("MmapVectorStore is read-only - update Chroma and re-export")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Build with Chroma, then export with mmap_index.export_chroma")
+
+if __name__ == "__main__":
+    from langchain_community.vectorstores import Chroma
+    db_path = sys.argv[1] if len(sys.argv) > 1 else "./chroma_db_bot"
+    out_dir = sys.argv[2] if len(sys.argv) > 2 else MMAP_INDEX_DIR
+    store = Chroma(persist_directory=db_path)
+    print(f"📦 Exporting {db_path} → {out_dir}...", flush=True)
+    export_chroma(store, out_dir, fingerprint=chroma_fingerprint(store, db_path))
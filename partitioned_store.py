@@ -0,0 +1,189 @@
+"""
+Per-source partitioned vector store
+
+Keeps synaxarium / curriculum / library chunks in separate Chroma collections
+(bot_synaxarium, bot_curriculum, bot_library) inside chroma_db_bot. A query
+filtered on {"source": ...} scans only that partition; unfiltered queries are
+embedded once, fanned out to every partition in parallel and merged by
+distance. Each partition can be dropped and rebuilt on its own:
+
+    python partitioned_store.py rebuild synaxarium
+
+PartitionedVectorStore also exposes a `_collection` facade (count / get /
+upsert / delete routed by the "source" metadata), so the build, sync, BM25
+and mmap export code written against Chroma works unchanged.
+"""
+
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.vectorstores import VectorStore
+from langchain_community.vectorstores import Chroma
+
+PARTITIONS = ("synaxarium", "curriculum", "library")
+COLLECTION_PREFIX = "bot_"
+LEGACY_COLLECTION = "langchain"  # Default collection of the single-collection layout
+
+class PartitionedCollection:
+    """Chroma-collection-like facade over all partitions"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def count(self):
+        return sum(part._collection.count() for part in self.store.partitions.values())
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None):
+        include = include or ["documents", "metadatas"]
+        result = {"ids": [], "embeddings": [], "documents": [], "metadatas": []}
+        skip = offset or 0
+        remaining = limit
+        for part in self.store.partitions.values():
+            if remaining is not None and remaining <= 0:
+                break
+            if ids is None and where is None:
+                size = part._collection.count()
+                if skip >= size:
+                    skip -= size
+                    continue
+            page = part._collection.get(ids=ids, where=where, limit=remaining, offset=skip if ids is None and where is None else None, include=include)
+            skip = 0
+            result["ids"].extend(page["ids"])
+            for key in ("embeddings", "documents", "metadatas"):
+                if key in include and page.get(key) is not None:
+                    result[key].extend(list(page[key]))
+            if remaining is not None:
+                remaining -= len(page["ids"])
+        return result
+
+    def upsert(self, ids, embeddings=None, documents=None, metadatas=None):
+        for source, rows in self.store.route([m.get("source") for m in metadatas]).items():
+            self.store.partitions[source]._collection.upsert(
+                ids=[ids[i] for i in rows],
+                embeddings=[embeddings[i] for i in rows] if embeddings is not None else None,
+                documents=[documents[i] for i in rows] if documents is not None else None,
+                metadatas=[metadatas[i] for i in rows],
+            )
+
+    def delete(self, ids=None, where=None):
+        for part in self.store.partitions.values():
+            part._collection.delete(ids=ids, where=where)
+
+class PartitionedVectorStore(VectorStore):
+    """One Chroma collection per source tag, searched selectively or in parallel"""
+
+    def __init__(self, persist_directory, embedding_function, partitions=PARTITIONS):
+        self._embedding_function = embedding_function
+        self.persist_directory = persist_directory
+        self.partitions = {
+            source: Chroma(
+                collection_name=COLLECTION_PREFIX + source,
+                persist_directory=persist_directory,
+                embedding_function=embedding_function,
+            )
+            for source in partitions
+        }
+        self._collection = PartitionedCollection(self)
+        self._executor = ThreadPoolExecutor(max_workers=len(self.partitions), thread_name_prefix="partition")
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    def route(self, sources):
+        """Group row indexes by partition (unknown sources go to library)"""
+        groups = {}
+        for i, source in enumerate(sources):
+            groups.setdefault(source if source in self.partitions else "library", []).append(i)
+        return groups
+
+    def migrate_legacy_collection(self, page_size=5000):
+        """Copy a single-collection database into partitions (vectors reused, nothing re-embedded)"""
+        client = next(iter(self.partitions.values()))._client
+        if LEGACY_COLLECTION not in [getattr(c, "name", c) for c in client.list_collections()]:
+            return 0
+        legacy = client.get_collection(LEGACY_COLLECTION)
+        total = legacy.count()
+        print(f"🔀 Migrating {total:,} chunks into per-source partitions...", flush=True)
+        offset = 0
+        while offset < total:
+            page = legacy.get(include=["embeddings", "documents", "metadatas"], limit=page_size, offset=offset)
+            if not len(page["ids"]):
+                break
+            self._collection.upsert(
+                ids=page["ids"],
+                embeddings=list(page["embeddings"]),
+                documents=page["documents"],
+                metadatas=[m or {} for m in page["metadatas"]],
+            )
+            offset += len(page["ids"])
+        client.delete_collection(LEGACY_COLLECTION)
+        print(f"   ✅ Migrated: " + ", ".join(f"{s} {p._collection.count():,}" for s, p in self.partitions.items()), flush=True)
+        return total
+
+    def reset_partition(self, source):
+        """Drop one partition so it can be rebuilt without touching the others"""
+        part = self.partitions[source]
+        part.delete_collection()
+        self.partitions[source] = Chroma(
+            collection_name=COLLECTION_PREFIX + source,
+            persist_directory=self.persist_directory,
+            embedding_function=self._embedding_function,
+        )
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        added = []
+        for source, rows in self.route([m.get("source") for m in metadatas]).items():
+            added.extend(self.partitions[source].add_texts(
+                [texts[i] for i in rows],
+                metadatas=[metadatas[i] for i in rows],
+                ids=[ids[i] for i in rows] if ids is not None else None,
+            ))
+        return added
+
+    def delete(self, ids=None, **kwargs):
+        self._collection.delete(ids=ids)
+
+    @staticmethod
+    def _split_filter(filter):
+        """(partition source or None, remaining Chroma filter or None)"""
+        if not filter or not isinstance(filter.get("source"), str):
+            return None, filter or None
+        rest = {key: value for key, value in filter.items() if key != "source"}
+        return filter["source"], rest or None
+
+    def similarity_search_with_score(self, query, k=4, filter=None, **kwargs):
+        source, rest = self._split_filter(filter)
+        if source is not None:
+            if source not in self.partitions:
+                return []
+            return self.partitions[source].similarity_search_with_score(query, k=k, filter=rest)
+
+        # Embed once, then scan every partition concurrently and merge by distance
+        vector = self._embedding_function.embed_query(query)
+        futures = [
+            self._executor.submit(part.similarity_search_by_vector_with_relevance_scores, vector, k, rest)
+            for part in self.partitions.values() if part._collection.count()
+        ]
+        merged = [hit for future in futures for hit in future.result()]
+        return sorted(merged, key=lambda hit: hit[1])[:k]
+
+    def similarity_search(self, query, k=4, filter=None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Open with PartitionedVectorStore(persist_directory, embedding) and add_texts")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "rebuild" or sys.argv[2] not in PARTITIONS:
+        print(f"Usage: python partitioned_store.py rebuild [{'|'.join(PARTITIONS)}]")
+        sys.exit(1)
+    import telegram_bot
+    from embedding_backend import get_embeddings
+    store = PartitionedVectorStore("./chroma_db_bot", get_embeddings())
+    telegram_bot.rebuild_partition(store, "./chroma_db_bot", sys.argv[2])
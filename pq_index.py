@@ -0,0 +1,230 @@
+"""
+Compressed (product- or int8 scalar-quantized) embedding index
+
+Adds quantized codes to a mmap_index export so the only vector data held in
+RAM is a few bytes per chunk:
+
+    pq   - 48 sub-spaces x 256 centroids → 48 bytes/chunk (32x smaller than float32)
+    sq8  - per-dimension uint8 scalar quantization → 384 bytes/chunk (4x smaller)
+
+Codes are trained and encoded from the export's float16 embeddings.npy, so
+building adds only the codes to the deployed index. Search scores every chunk
+from the codes (asymmetric distance: the query stays float32), then re-ranks
+the best RERANK_CANDIDATES against those float16 rows, which stay on disk
+(memory-mapped) and are only touched for the candidates.
+
+Build + report memory saved vs recall@3 lost, measured as the overlap with
+the current Chroma retriever's top 3 on real questions (one per line in
+queries.txt, or the sample questions of benchmark_embeddings.py):
+    python pq_index.py [pq|sq8] [chroma_db_bot] [mmap_index] [queries.txt]
+"""
+
+import os
+import sys
+import json
+import time
+import numpy as np
+from mmap_index import MmapVectorStore, MMAP_INDEX_DIR
+
+PQ_SUBSPACES = 48
+PQ_CENTROIDS = 256
+PQ_TRAIN_SAMPLE = 20000
+PQ_KMEANS_ITERATIONS = 20
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+SCAN_BLOCK_ROWS = 16384
+
+def _kmeans(points, n_clusters, iterations, rng):
+    """Plain Lloyd's k-means, enough for 8-dim PQ sub-spaces"""
+    n_clusters = min(n_clusters, len(points))
+    centroids = points[rng.choice(len(points), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        distances = (points ** 2).sum(1)[:, None] - 2 * points @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        assignment = distances.argmin(1)
+        for c in range(n_clusters):
+            members = points[assignment == c]
+            if len(members):
+                centroids[c] = members.mean(0)
+    return centroids
+
+def _pq_encode(vectors, codebooks):
+    n_sub, _, dsub = codebooks.shape
+    codes = np.empty((len(vectors), n_sub), dtype=np.uint8)
+    for m in range(n_sub):
+        sub = vectors[:, m * dsub:(m + 1) * dsub]
+        centroids = codebooks[m]
+        distances = -2 * sub @ centroids.T + (centroids ** 2).sum(1)[None, :]
+        codes[:, m] = distances.argmin(1)
+    return codes
+
+def build_quantized_index(index_dir=MMAP_INDEX_DIR, mode="pq"):
+    """Write the quantized codes for a mmap_index export, from its float16 embeddings"""
+    start_time = time.time()
+    with open(os.path.join(index_dir, "meta.json"), 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    ids = meta["ids"]
+    if not ids:
+        raise ValueError(f"mmap_index export in {index_dir} is empty - nothing to quantize")
+    full = np.load(os.path.join(index_dir, "embeddings.npy"), mmap_mode='r')  # float16, L2-normalised
+    dim = full.shape[1]
+    stale_copy = os.path.join(index_dir, "full_f32.npy")  # Written by earlier versions
+    if os.path.exists(stale_copy):
+        os.remove(stale_copy)
+
+    if mode == "pq":
+        if dim % PQ_SUBSPACES:
+            raise ValueError(f"dimension {dim} not divisible into {PQ_SUBSPACES} sub-spaces")
+        dsub = dim // PQ_SUBSPACES
+        rng = np.random.default_rng(0)
+        sample = np.asarray(full[np.sort(rng.choice(len(ids), min(PQ_TRAIN_SAMPLE, len(ids)), replace=False))], dtype=np.float32)
+        codebooks = np.zeros((PQ_SUBSPACES, PQ_CENTROIDS, dsub), dtype=np.float32)
+        for m in range(PQ_SUBSPACES):
+            trained = _kmeans(sample[:, m * dsub:(m + 1) * dsub], PQ_CENTROIDS, PQ_KMEANS_ITERATIONS, rng)
+            codebooks[m, :len(trained)] = trained
+        codes = np.concatenate([
+            _pq_encode(np.asarray(full[i:i + SCAN_BLOCK_ROWS], dtype=np.float32), codebooks)
+            for i in range(0, len(ids), SCAN_BLOCK_ROWS)
+        ])
+        np.save(os.path.join(index_dir, "pq_codebooks.npy"), codebooks)
+    elif mode == "sq8":
+        low = np.asarray(full.min(0), dtype=np.float32)
+        scale = np.clip((np.asarray(full.max(0), dtype=np.float32) - low) / 255.0, 1e-12, None)
+        codes = np.concatenate([
+            np.clip(np.rint((np.asarray(full[i:i + SCAN_BLOCK_ROWS], dtype=np.float32) - low) / scale), 0, 255).astype(np.uint8)
+            for i in range(0, len(ids), SCAN_BLOCK_ROWS)
+        ])
+        np.save(os.path.join(index_dir, "sq8_params.npy"), np.stack([low, scale]).astype(np.float32))
+    else:
+        raise ValueError(f"Unknown quantization mode: {mode!r} (expected 'pq' or 'sq8')")
+
+    np.save(os.path.join(index_dir, f"{mode}_codes.npy"), codes)
+    with open(os.path.join(index_dir, f"{mode}_meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({"fingerprint": meta.get("fingerprint"), "count": len(ids)}, f)
+    print(f"   ✅ {mode} index: {codes.nbytes / (1024*1024):.1f} MB of codes for {len(ids):,} chunks in {time.time() - start_time:.1f}s", flush=True)
+
+def quantized_fingerprint(index_dir=MMAP_INDEX_DIR, mode="pq"):
+    try:
+        with open(os.path.join(index_dir, f"{mode}_meta.json"), 'r', encoding='utf-8') as f:
+            return json.load(f).get("fingerprint")
+    except (OSError, ValueError):
+        return None
+
+class QuantizedVectorStore(MmapVectorStore):
+    """MmapVectorStore that scans quantized codes and re-ranks candidates exactly"""
+
+    def __init__(self, index_dir=MMAP_INDEX_DIR, embedding_function=None, mode="pq", rerank_candidates=RERANK_CANDIDATES):
+        super().__init__(index_dir, embedding_function)
+        self.mode = mode
+        self.rerank_candidates = rerank_candidates
+        self.codes = np.load(os.path.join(index_dir, f"{mode}_codes.npy"))  # Resident
+        if mode == "pq":
+            self.codebooks = np.load(os.path.join(index_dir, "pq_codebooks.npy"))
+        else:
+            self.low, self.scale = np.load(os.path.join(index_dir, "sq8_params.npy"))
+
+    def resident_bytes(self):
+        extra = self.codebooks.nbytes if self.mode == "pq" else self.low.nbytes + self.scale.nbytes
+        return self.codes.nbytes + extra
+
+    def approximate_scores(self, query):
+        """Asymmetric scores for every chunk: float32 query against quantized chunks"""
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        if self.mode == "pq":
+            n_sub, _, dsub = self.codebooks.shape
+            # table[m, c] = query sub-vector m · centroid c
+            table = np.einsum("mcd,md->mc", self.codebooks, query.reshape(n_sub, dsub))
+            sub_index = np.arange(n_sub)
+            for start in range(0, len(scores), SCAN_BLOCK_ROWS):
+                block = self.codes[start:start + SCAN_BLOCK_ROWS]
+                scores[start:start + len(block)] = table[sub_index, block].sum(1)
+        else:
+            weights = self.scale * query
+            bias = float(self.low @ query)
+            for start in range(0, len(scores), SCAN_BLOCK_ROWS):
+                block = self.codes[start:start + SCAN_BLOCK_ROWS]
+                scores[start:start + len(block)] = block.astype(np.float32) @ weights + bias
+        return scores
+
+    def search_by_vector(self, vector, k=4, filter=None, exact_rerank=True):
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.approximate_scores(query)
+        if filter:
+            scores[~self._filter_mask(filter)] = -np.inf
+        n_candidates = min(max(k, self.rerank_candidates if exact_rerank else k), len(scores))
+        if n_candidates <= 0:
+            return []
+        candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+        candidates = candidates[np.isfinite(scores[candidates])]
+        if exact_rerank:
+            candidates = np.sort(candidates)  # Sequential disk reads
+            exact = np.asarray(self.matrix[candidates], dtype=np.float32) @ query  # float16 rows, on disk
+            order = np.argsort(-exact)[:k]
+            return [(int(candidates[i]), float(exact[i])) for i in order]
+        order = np.argsort(-scores[candidates])[:k]
+        return [(int(candidates[i]), float(scores[candidates[i]])) for i in order]
+
+def _doc_key(doc):
+    # Chroma's LangChain results carry no ids, so chunks are matched by source + text
+    return ((doc.metadata or {}).get("source"), doc.page_content)
+
+def recall_report(reference_store, store, queries, k=3):
+    """
+    Recall@k of the quantized store against the current retriever, on real text queries.
+
+    reference_store is the Chroma store the bot retrieves from today
+    (as_retriever(search_kwargs={"k": 3})); its top-k is the ground truth.
+    Returns (codes-only recall, recall with exact re-rank).
+    """
+    reference = reference_store.as_retriever(search_kwargs={"k": k})
+    quantized = store.as_retriever(search_kwargs={"k": k})
+    approx_hits = rerank_hits = total = 0
+    for query in queries:
+        truth = {_doc_key(doc) for doc in reference.invoke(query)}
+        if not truth:
+            continue
+        vector = store.embeddings.embed_query(query)
+        approx = {_doc_key(store.document(row)) for row, _ in store.search_by_vector(vector, k, exact_rerank=False)}
+        approx_hits += len(truth & approx)
+        rerank_hits += len(truth & {_doc_key(doc) for doc in quantized.invoke(query)})
+        total += len(truth)
+    if not total:
+        return 0.0, 0.0
+    return approx_hits / total, rerank_hits / total
+
+def load_queries(path=None):
+    """One question per line from path, or the benchmark's sample questions"""
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    from benchmark_embeddings import QUERIES
+    return QUERIES
+
+if __name__ == "__main__":
+    from langchain_community.vectorstores import Chroma
+    from mmap_index import export_chroma, chroma_fingerprint, read_fingerprint
+    from embedding_service import get_shared_embeddings
+    mode = sys.argv[1] if len(sys.argv) > 1 else "pq"
+    db_path = sys.argv[2] if len(sys.argv) > 2 else "./chroma_db_bot"
+    index_dir = sys.argv[3] if len(sys.argv) > 3 else MMAP_INDEX_DIR
+    queries = load_queries(sys.argv[4] if len(sys.argv) > 4 else None)
+
+    embeddings = get_shared_embeddings()
+    chroma_store = Chroma(persist_directory=db_path, embedding_function=embeddings)
+    fingerprint = chroma_fingerprint(chroma_store, db_path)
+    if read_fingerprint(index_dir) != fingerprint:
+        export_chroma(chroma_store, index_dir, fingerprint=fingerprint)
+    build_quantized_index(index_dir, mode)
+
+    store = QuantizedVectorStore(index_dir, embedding_function=embeddings, mode=mode)
+    float32_bytes = store.matrix.shape[0] * store.matrix.shape[1] * 4
+    approx_recall, rerank_recall = recall_report(chroma_store, store, queries)
+    print("\n" + "="*60)
+    print(f"{mode.upper()} INDEX REPORT ({len(store):,} chunks, {len(queries)} queries vs Chroma top-3)")
+    print("="*60)
+    print(f"   float32 vectors in RAM:   {float32_bytes / (1024*1024):8.1f} MB (Chroma)")
+    print(f"   float16 export (mmap):    {store.matrix.nbytes / (1024*1024):8.1f} MB (re-rank rows, on disk)")
+    print(f"   {mode} codes in RAM:       {store.resident_bytes() / (1024*1024):8.1f} MB ({float32_bytes / store.resident_bytes():.0f}x smaller)")
+    print(f"   memory saved:             {(float32_bytes - store.resident_bytes()) / (1024*1024):8.1f} MB")
+    print(f"   recall@3 codes only:      {approx_recall:8.1%}")
+    print(f"   recall@3 + exact re-rank: {rerank_recall:8.1%} (top {store.rerank_candidates} re-ranked from disk)")
+    print("="*60 + "\n")
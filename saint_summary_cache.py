@@ -0,0 +1,176 @@
+"""
+Per-day Saint of the Day summary cache
+
+/saint and the 7 AM broadcast both need the same DeepSeek summary of the
+day's Synaxarium entry. The summary is generated once per Ethiopian-timezone
+day (ahead of the broadcast, and optionally for the next SAINT_PREFETCH_DAYS
+days), persisted to SAINT_SUMMARY_PATH and served to both paths. Concurrent
+requests for a day that is not cached yet wait on a single generation
+(single-flight) instead of each calling the LLM.
+
+Forked bot workers (BOT_WORKERS) share the file: a miss takes an exclusive
+flock on SAINT_SUMMARY_PATH.lock, re-reads the file (another worker may have
+generated the day meanwhile) and only then generates, so each day costs one
+LLM call per host. Writes merge into the file's current contents under the
+same lock instead of overwriting it with this process's copy.
+"""
+
+import os
+import json
+import fcntl
+import time
+import asyncio
+import threading
+from datetime import date, timedelta
+
+SAINT_SUMMARY_PATH = os.getenv("SAINT_SUMMARY_PATH", "saint_summaries.json")
+SAINT_PREFETCH_DAYS = int(os.getenv("SAINT_PREFETCH_DAYS", "1"))  # Days ahead of today to pre-generate
+SAINT_SUMMARY_KEEP_DAYS = 7  # Past days kept in the file
+FILE_LOCK_POLL_INTERVAL = 0.1
+
+class SaintSummaryCache:
+    """{ISO date: {date_label, summary, fingerprint}} persisted as JSON"""
+
+    def __init__(self, path=SAINT_SUMMARY_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._inflight = {}  # ISO date -> asyncio.Future of the generation in progress
+        self._entries = self._read()
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Saint summary cache unreadable, starting empty: {e}", flush=True)
+            return {}
+
+    def reload(self):
+        """Merge in entries other processes wrote to the file"""
+        entries = self._read()
+        with self._lock:
+            self._entries.update(entries)
+
+    def _open_file_lock(self):
+        return os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+
+    async def _acquire_file_lock(self):
+        """Exclusive cross-process lock; polled so a cancelled waiter never holds it"""
+        fd = self._open_file_lock()
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except BlockingIOError:
+                    await asyncio.sleep(FILE_LOCK_POLL_INTERVAL)
+        except BaseException:
+            os.close(fd)
+            raise
+
+    @staticmethod
+    def _release_file_lock(fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, day, fingerprint=None):
+        """(date_label, summary) for a date, or None if missing or generated from other sources"""
+        entry = self._entries.get(day.isoformat())
+        if entry is None or entry.get("fingerprint") != fingerprint:
+            return None
+        return entry["date_label"], entry["summary"]
+
+    def put(self, day, date_label, summary, fingerprint=None):
+        """Store a summary, merged into the file under the cross-process lock (blocking)"""
+        fd = self._open_file_lock()
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self._put_locked(day, date_label, summary, fingerprint)
+        finally:
+            self._release_file_lock(fd)
+
+    def _put_locked(self, day, date_label, summary, fingerprint=None):
+        entries = self._read()
+        with self._lock:
+            entries.update({key: value for key, value in self._entries.items() if key not in entries})
+            entries[day.isoformat()] = {
+                "date_label": date_label,
+                "summary": summary,
+                "fingerprint": fingerprint,
+                "created_at": time.time(),
+            }
+            oldest = (date.today() - timedelta(days=SAINT_SUMMARY_KEEP_DAYS)).isoformat()
+            self._entries = {key: value for key, value in entries.items() if key >= oldest}
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._entries, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    async def get_or_generate(self, day, generate, fingerprint=None):
+        """Cached (date_label, summary), else await generate(day) - once per day"""
+        cached = self.get(day, fingerprint)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        key = day.isoformat()
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise  # This waiter was cancelled
+                # The generating task was cancelled: generate here instead
+                return await self.get_or_generate(day, generate, fingerprint)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        file_lock = None
+        try:
+            file_lock = await self._acquire_file_lock()
+            # Another worker may have generated it while this one waited
+            await asyncio.to_thread(self.reload)
+            cached = self.get(day, fingerprint)
+            if cached is not None:
+                self.hits += 1
+                date_label, summary = cached
+            else:
+                self.misses += 1
+                date_label, summary = await generate(day)
+                if summary:
+                    await asyncio.to_thread(self._put_locked, day, date_label, summary, fingerprint)
+            future.set_result((date_label, summary))
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if not future.done():
+                future.cancel()  # Cancelled mid-generation: never leave waiters hanging
+            if file_lock is not None:
+                self._release_file_lock(file_lock)
+            self._inflight.pop(key, None)
+        return date_label, summary
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
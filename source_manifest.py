@@ -0,0 +1,110 @@
+"""
+Content-hash manifest for incremental conversion and ingestion
+
+Tracks size, mtime and SHA-256 of every file a tool has processed, plus any
+extra data the tool wants to remember (e.g. the chunk ids a source file was
+embedded as). convert_pdfs.py keeps one next to its output in sources/, and
+telegram_bot.setup() keeps one inside chroma_db_bot/ so it always describes
+exactly what that database contains.
+"""
+
+import os
+import json
+import hashlib
+
+MANIFEST_VERSION = 1
+
+def file_sha256(path):
+    """SHA-256 of a file, read in 1 MB blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def assign_chunk_ids(splits):
+    """Stable chunk ids "<filename>#<n>" so a file's chunks can be replaced or deleted later"""
+    counters = {}
+    ids = []
+    for doc in splits:
+        filename = doc.metadata.get("filename", "unknown")
+        n = counters.get(filename, 0)
+        counters[filename] = n + 1
+        ids.append(f"{filename}#{n}")
+    return ids
+
+class SourceManifest:
+    """Persisted {name: {size, mtime, sha256, ...}} table backed by a JSON file"""
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.files = {}
+        self.exists = os.path.exists(manifest_path)
+        if self.exists:
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.files = data.get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"   ⚠️ Ignoring unreadable manifest {manifest_path}: {e}", flush=True)
+                self.exists = False
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def get(self, name):
+        return self.files.get(name)
+
+    def names(self):
+        return set(self.files)
+
+    def is_changed(self, name, path):
+        """
+        True if `path` is new or its content differs from what was recorded.
+
+        Size + mtime equal to the recorded values is trusted without hashing;
+        otherwise the file is hashed, so a touched-but-identical file is not
+        reported as changed.
+        """
+        entry = self.files.get(name)
+        if entry is None:
+            return True
+        stat = os.stat(path)
+        if stat.st_size == entry["size"] and stat.st_mtime == entry["mtime"]:
+            return False
+        if stat.st_size != entry["size"]:
+            return True
+        if file_sha256(path) != entry["sha256"]:
+            return True
+        # Same bytes, new mtime - refresh so the next check takes the fast path
+        entry["mtime"] = stat.st_mtime
+        return False
+
+    def record(self, name, path, **extra):
+        """Store the current size/mtime/hash of `path` under `name`, plus any extra fields"""
+        stat = os.stat(path)
+        entry = {
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "sha256": file_sha256(path),
+        }
+        entry.update(extra)
+        self.files[name] = entry
+        return entry
+
+    def remove(self, name):
+        return self.files.pop(name, None)
+
+    def save(self):
+        """Write atomically (temp file + rename) so a crash never leaves half a manifest"""
+        directory = os.path.dirname(self.manifest_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, indent=1, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        self.exists = True
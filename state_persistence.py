@@ -0,0 +1,230 @@
+"""
+SQLite persistence for user_data / chat_data / bot_data (write-behind)
+
+Plugs into python-telegram-bot as the Application's persistence, so
+context.user_data["conversation_history"] survives redeploys. PTB already
+collects changed users/chats and hands them over every STATE_FLUSH_INTERVAL
+seconds; they are staged here and written together in one transaction off
+the event loop, instead of one write per message.
+
+Each value is stored as compact JSON, zlib-compressed once it is larger than
+COMPRESS_MIN_BYTES, in a WAL-mode database any number of processes can read.
+Before each update PTB asks for a refresh: if another process wrote a newer
+version of that user's or chat's row, it replaces the in-memory copy, so
+follow-up questions keep their history whichever worker handles them. Every
+write bumps the row's integer version (version + 1), so a refresh compares
+counters rather than wall-clock times; it runs off the event loop and only
+reads the row when SQLite's data_version says another connection committed
+since that row was last checked.
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import asyncio
+import threading
+from telegram.ext import BasePersistence, PersistenceInput
+
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "bot_state.sqlite3")
+STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL", "10"))
+COMPRESS_MIN_BYTES = 512
+
+def encode_state(data):
+    raw = json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if len(raw) >= COMPRESS_MIN_BYTES:
+        return b"z" + zlib.compress(raw, 6)
+    return b"j" + raw
+
+def decode_state(blob):
+    blob = bytes(blob)
+    raw = zlib.decompress(blob[1:]) if blob[:1] == b"z" else blob[1:]
+    return json.loads(raw.decode("utf-8"))
+
+class SQLitePersistence(BasePersistence):
+    """user/chat/bot data in one (kind, key) → blob table, flushed in batches"""
+
+    def __init__(self, path=STATE_DB_PATH, update_interval=STATE_FLUSH_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=True, chat_data=True, user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS state (
+            kind TEXT NOT NULL,
+            key INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            updated_at REAL NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (kind, key)
+        ) WITHOUT ROWID""")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(state)")}
+        if "version" not in columns:  # Databases written before the version counter
+            self._db.execute("ALTER TABLE state ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS conversations (
+            name TEXT NOT NULL,
+            key TEXT NOT NULL,
+            state TEXT,
+            PRIMARY KEY (name, key)
+        ) WITHOUT ROWID""")
+        self._db.commit()
+        self._pending = {}   # (kind, key) -> encoded blob, or None to delete
+        self._versions = {}  # (kind, key) -> version of the copy this process holds
+        self._checked = {}   # (kind, key) -> data_version when that row was last compared
+        self._flush_task = None
+        self._bot_blob = None  # Last staged bot_data, since PTB hands it over every interval
+        self.flushes = 0
+        self.rows_written = 0
+
+    # Loading
+
+    def _load_kind(self, kind):
+        with self._lock:
+            rows = self._db.execute("SELECT key, data, version FROM state WHERE kind = ?", (kind,)).fetchall()
+        result = {}
+        for key, blob, version in rows:
+            result[key] = decode_state(blob)
+            self._versions[(kind, key)] = version
+        return result
+
+    async def get_user_data(self):
+        return await asyncio.to_thread(self._load_kind, "user")
+
+    async def get_chat_data(self):
+        return await asyncio.to_thread(self._load_kind, "chat")
+
+    async def get_bot_data(self):
+        bot_data = (await asyncio.to_thread(self._load_kind, "bot")).get(0, {})
+        self._bot_blob = encode_state(bot_data)
+        return bot_data
+
+    async def get_callback_data(self):
+        return None
+
+    def _load_conversations(self, name):
+        with self._lock:
+            rows = self._db.execute("SELECT key, state FROM conversations WHERE name = ?", (name,)).fetchall()
+        return {tuple(json.loads(key)): json.loads(state) for key, state in rows}
+
+    async def get_conversations(self, name):
+        return await asyncio.to_thread(self._load_conversations, name)
+
+    # Write-behind
+
+    def _stage(self, kind, key, data):
+        self._pending[(kind, key)] = None if data is None else encode_state(data)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_pending())
+
+    async def _flush_pending(self):
+        await asyncio.sleep(0)  # Let the rest of PTB's update batch get staged first
+        if self._pending:
+            batch, self._pending = self._pending, {}
+            await asyncio.to_thread(self._write, batch)
+
+    def _write(self, batch):
+        now = time.time()
+        with self._lock:
+            with self._db:
+                for (kind, key), blob in batch.items():
+                    if blob is None:
+                        self._db.execute("DELETE FROM state WHERE kind = ? AND key = ?", (kind, key))
+                        self._versions.pop((kind, key), None)
+                    else:
+                        (version,) = self._db.execute(
+                            """INSERT INTO state (kind, key, data, updated_at, version) VALUES (?, ?, ?, ?, 1)
+                            ON CONFLICT (kind, key) DO UPDATE
+                            SET data = excluded.data, updated_at = excluded.updated_at, version = state.version + 1
+                            RETURNING version""",
+                            (kind, key, blob, now),
+                        ).fetchone()
+                        self._versions[(kind, key)] = version
+        self.flushes += 1
+        self.rows_written += len(batch)
+
+    async def update_user_data(self, user_id, data):
+        self._stage("user", user_id, data)
+
+    async def update_chat_data(self, chat_id, data):
+        self._stage("chat", chat_id, data)
+
+    async def update_bot_data(self, data):
+        blob = encode_state(data)
+        if blob != self._bot_blob:
+            self._bot_blob = blob
+            self._stage("bot", 0, data)
+
+    async def update_callback_data(self, data):
+        pass
+
+    def _write_conversation(self, name, key, new_state):
+        with self._lock:
+            with self._db:
+                if new_state is None:
+                    self._db.execute("DELETE FROM conversations WHERE name = ? AND key = ?", (name, json.dumps(key)))
+                else:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO conversations (name, key, state) VALUES (?, ?, ?)",
+                        (name, json.dumps(key), json.dumps(new_state)),
+                    )
+
+    async def update_conversation(self, name, key, new_state):
+        await asyncio.to_thread(self._write_conversation, name, key, new_state)
+
+    async def drop_user_data(self, user_id):
+        self._stage("user", user_id, None)
+
+    async def drop_chat_data(self, chat_id):
+        self._stage("chat", chat_id, None)
+
+    # Multi-process refresh
+
+    def _newer_copy(self, kind, key):
+        """(data, version) if another process stored a newer version of the row, else None"""
+        with self._lock:
+            # data_version only moves when another connection commits
+            (data_version,) = self._db.execute("PRAGMA data_version").fetchone()
+            if self._checked.get((kind, key)) == data_version:
+                return None
+            self._checked[(kind, key)] = data_version
+            row = self._db.execute("SELECT data, version FROM state WHERE kind = ? AND key = ?", (kind, key)).fetchone()
+        if row is None or row[1] <= self._versions.get((kind, key), 0):
+            return None
+        return decode_state(row[0]), row[1]
+
+    async def _refresh(self, kind, key, target):
+        """Replace target in place if another process stored a newer version"""
+        if (kind, key) in self._pending:
+            return
+        newer = await asyncio.to_thread(self._newer_copy, kind, key)
+        if newer is None or (kind, key) in self._pending:
+            return
+        target.clear()
+        target.update(newer[0])
+        self._versions[(kind, key)] = newer[1]
+
+    async def refresh_user_data(self, user_id, user_data):
+        await self._refresh("user", user_id, user_data)
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        await self._refresh("chat", chat_id, chat_data)
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        """Write everything still staged (called by PTB on shutdown)"""
+        if self._flush_task is not None and not self._flush_task.done():
+            await self._flush_task
+        if self._pending:
+            batch, self._pending = self._pending, {}
+            self._write(batch)
+        print(f"💾 State persisted: {self.rows_written} rows in {self.flushes} flushes", flush=True)
+
+    def stats(self):
+        return {"flushes": self.flushes, "rows_written": self.rows_written, "pending": len(self._pending)}
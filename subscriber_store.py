@@ -0,0 +1,125 @@
+"""
+Subscriber store for the daily saint message
+
+SQLite (WAL) table keyed by chat id, replacing subscribers.txt: subscribe and
+unsubscribe are single indexed writes instead of a full-file rewrite,
+concurrent /start commands can't lose each other's writes, and the broadcast
+pages through chat ids in order without loading the whole table. Each
+subscriber carries optional metadata (timezone, language).
+
+Methods are blocking; the bot calls them through asyncio.to_thread so the
+event loop never waits on disk. An existing subscribers.txt is imported once
+and renamed to subscribers.txt.migrated.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+SUBSCRIBERS_DB_PATH = os.getenv("SUBSCRIBERS_DB_PATH", "subscribers.sqlite3")
+LEGACY_SUBSCRIBERS_FILE = "subscribers.txt"
+DEFAULT_TIMEZONE = "Africa/Addis_Ababa"
+
+class SubscriberStore:
+    """chat_id → (timezone, language, subscribed_at), persisted in SQLite"""
+
+    def __init__(self, path=SUBSCRIBERS_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS subscribers (
+            chat_id INTEGER PRIMARY KEY,
+            timezone TEXT NOT NULL DEFAULT 'Africa/Addis_Ababa',
+            language TEXT,
+            subscribed_at REAL NOT NULL
+        )""")
+        self._db.commit()
+
+    def subscribe(self, chat_id, timezone=None, language=None):
+        """True if the chat was not subscribed before"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO subscribers (chat_id, timezone, language, subscribed_at) VALUES (?, ?, ?, ?)",
+                (chat_id, timezone or DEFAULT_TIMEZONE, language, time.time()),
+            )
+            if cursor.rowcount == 0 and language is not None:
+                self._db.execute("UPDATE subscribers SET language = ? WHERE chat_id = ?", (language, chat_id))
+            self._db.commit()
+            return cursor.rowcount > 0
+
+    def unsubscribe(self, chat_id):
+        """True if the chat was subscribed"""
+        return self.remove_many([chat_id]) > 0
+
+    def remove_many(self, chat_ids):
+        with self._lock:
+            cursor = self._db.executemany("DELETE FROM subscribers WHERE chat_id = ?", [(chat_id,) for chat_id in chat_ids])
+            self._db.commit()
+            return cursor.rowcount
+
+    def set_metadata(self, chat_id, timezone=None, language=None):
+        with self._lock:
+            if timezone is not None:
+                self._db.execute("UPDATE subscribers SET timezone = ? WHERE chat_id = ?", (timezone, chat_id))
+            if language is not None:
+                self._db.execute("UPDATE subscribers SET language = ? WHERE chat_id = ?", (language, chat_id))
+            self._db.commit()
+
+    def get(self, chat_id):
+        """{"chat_id", "timezone", "language", "subscribed_at"} or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT chat_id, timezone, language, subscribed_at FROM subscribers WHERE chat_id = ?", (chat_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("chat_id", "timezone", "language", "subscribed_at"), row))
+
+    def __contains__(self, chat_id):
+        return self.get(chat_id) is not None
+
+    def count(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM subscribers").fetchone()[0]
+
+    def chat_ids_page(self, after=None, batch_size=1000):
+        """Up to batch_size chat ids greater than after, in ascending order (keyset pagination)"""
+        with self._lock:
+            if after is None:
+                rows = self._db.execute("SELECT chat_id FROM subscribers ORDER BY chat_id LIMIT ?", (batch_size,)).fetchall()
+            else:
+                rows = self._db.execute("SELECT chat_id FROM subscribers WHERE chat_id > ? ORDER BY chat_id LIMIT ?", (after, batch_size)).fetchall()
+        return [chat_id for (chat_id,) in rows]
+
+    def iter_chat_ids(self, batch_size=1000):
+        """Chat ids in ascending order, read one primary-key page at a time"""
+        last = None
+        while True:
+            page = self.chat_ids_page(last, batch_size)
+            if not page:
+                return
+            yield from page
+            last = page[-1]
+
+    def migrate_text_file(self, path=LEGACY_SUBSCRIBERS_FILE):
+        """Import a legacy one-chat-id-per-line file, then rename it so it is imported only once"""
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'r') as f:
+            chat_ids = [int(line.strip()) for line in f if line.strip().lstrip('-').isdigit()]
+        now = time.time()
+        with self._lock:
+            cursor = self._db.executemany(
+                "INSERT OR IGNORE INTO subscribers (chat_id, timezone, subscribed_at) VALUES (?, ?, ?)",
+                [(chat_id, DEFAULT_TIMEZONE, now) for chat_id in chat_ids],
+            )
+            self._db.commit()
+        os.replace(path, path + ".migrated")
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -6,7 +6,7 @@ Tests if DeepSeek AI follows curriculum (even when facts are wrong)
 import os
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from embedding_service import get_shared_embeddings
 from langchain_community.document_loaders import TextLoader
 from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
@@ -144,9 +144,7 @@ def setup_rag_system():
     
     # 3. Create embeddings and vector store (using free local embeddings)
     print("🧠 Creating vector database...")
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
+    embeddings = get_shared_embeddings("torch")
     
     vectorstore = Chroma.from_documents(
         documents=splits,
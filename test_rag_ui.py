@@ -6,7 +6,7 @@ Run with: streamlit run test_rag_ui.py
 import streamlit as st
 from langchain_text_splitters import RecursiveCharacterTextSplitter  # FIXED
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from embedding_service import get_shared_embeddings
 from langchain_community.document_loaders import TextLoader
 from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
@@ -78,9 +78,7 @@ def setup_rag_system():
     splits = text_splitter.split_documents(documents)
     
     # Create embeddings and vector store
-    embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
-    )
+    embeddings = get_shared_embeddings("torch")
     
     vectorstore = Chroma.from_documents(
         documents=splits,
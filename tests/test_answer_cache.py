@@ -0,0 +1,45 @@
+from langchain_core.documents import Document
+from answer_cache import SemanticAnswerCache
+
+DOCS = [Document(page_content="Saint George is commemorated on Miyazya 23.", id="synaxarium.txt#4")]
+OTHER_DOCS = [Document(page_content="Tasbeha is the night praise.", id="curriculum.md#1")]
+
+class CountingConnection:
+    """sqlite3 connection proxy that counts commits"""
+
+    def __init__(self, db):
+        self.db = db
+        self.commits = 0
+
+    def commit(self):
+        self.commits += 1
+        self.db.commit()
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+def test_hit_requires_same_chunks_and_similar_question(tmp_path):
+    cache = SemanticAnswerCache(str(tmp_path / "answers.sqlite3"), threshold=0.95)
+    cache.store("who is saint george", [1.0, 0.0, 0.0], DOCS, "A martyr.")
+    assert cache.lookup([0.99, 0.05, 0.0], DOCS) == "A martyr."
+    assert cache.lookup([0.0, 1.0, 0.0], DOCS) is None
+    assert cache.lookup([1.0, 0.0, 0.0], OTHER_DOCS) is None
+
+def test_miss_does_not_commit(tmp_path):
+    cache = SemanticAnswerCache(str(tmp_path / "answers.sqlite3"))
+    cache._db = CountingConnection(cache._db)
+    for _ in range(5):
+        assert cache.lookup([1.0, 0.0], DOCS) is None
+    assert cache._db.commits == 0
+
+def test_workers_see_each_others_answers_and_evictions(tmp_path):
+    path = str(tmp_path / "answers.sqlite3")
+    worker_a = SemanticAnswerCache(path, max_size=1)
+    worker_b = SemanticAnswerCache(path, max_size=1)
+    worker_a.store("who is saint george", [1.0, 0.0], DOCS, "A martyr.")
+    assert worker_b.lookup([1.0, 0.0], DOCS) == "A martyr."
+
+    worker_a.store("what is tasbeha", [0.0, 1.0], OTHER_DOCS, "Night praise.")  # Evicts the first answer
+    assert worker_b.lookup([1.0, 0.0], DOCS) is None
+    assert worker_b.lookup([0.0, 1.0], OTHER_DOCS) == "Night praise."
+    assert len(worker_b) == 1
@@ -0,0 +1,62 @@
+import autocomplete_index
+from autocomplete_index import AutocompleteIndex, build_autocomplete_index
+from hybrid_retriever import BM25Index
+
+TEXTS = [
+    "Saint George is commemorated on Miyazya 23. Saint George slew the dragon.",
+    "Abune Tekle Haymanot founded Debre Libanos. Saint Gabriel is honoured monthly.",
+    "The Feast of George is kept with processions. Timket follows Genna.",
+    "Saint George appears again here.",
+]
+
+def make_bm25():
+    return BM25Index([f"doc#{n}" for n in range(len(TEXTS))], TEXTS, [{"source": "curriculum"} for _ in TEXTS])
+
+def titles(entries):
+    return [entry.title for entry in entries]
+
+def test_prefix_lookup_matches_title_start_and_later_words():
+    index = AutocompleteIndex.from_chunks(TEXTS, [{"source": "curriculum"}] * len(TEXTS))
+    assert titles(index.search("saint ge")) == ["Saint George"]
+    assert titles(index.search("st. ge")) == ["Saint George"]
+    assert "Abune Tekle Haymanot" in titles(index.search("tekle"))
+    assert index.search("nothing like this") == []
+
+def test_ranking_puts_title_starts_first_then_kind_then_count():
+    index = AutocompleteIndex.from_chunks(TEXTS, [{"source": "curriculum"}] * len(TEXTS))
+    results = index.search("ge")
+    # "Genna" starts with the prefix; "Saint George" (saint) beats "Feast of George" (feast)
+    assert titles(results) == ["Genna", "Saint George", "Feast of George"]
+    # Same position and kind: the more frequent title first
+    assert [(entry.title, entry.count) for entry in index.search("saint g")] == [("Saint George", 3), ("Saint Gabriel", 1)]
+
+def test_empty_and_short_prefix_are_bounded(monkeypatch):
+    index = AutocompleteIndex.from_chunks(TEXTS, [{"source": "curriculum"}] * len(TEXTS))
+    assert index.search("") == []
+    assert index.search("  ...  ") == []
+    assert len(index.search("s", limit=1)) == 1
+
+    monkeypatch.setattr(autocomplete_index, "MAX_SCAN_KEYS", 1)
+    # Only the first key in range is ranked, however many match the prefix
+    assert len(index.search("saint")) == 1
+
+def test_saved_index_is_loaded_with_mmap_when_fingerprint_matches(tmp_path, monkeypatch):
+    bm25 = make_bm25()
+    built = build_autocomplete_index(bm25, index_dir=str(tmp_path), fingerprint="v1")
+    assert (tmp_path / "meta.json").exists()
+
+    def no_rebuild(*args, **kwargs):
+        raise AssertionError("index was rebuilt")
+    monkeypatch.setattr(AutocompleteIndex, "from_chunks", no_rebuild)
+    loaded = build_autocomplete_index(bm25, index_dir=str(tmp_path), fingerprint="v1")
+    assert isinstance(loaded.keys, autocomplete_index._KeyArray)
+    for query in ("saint ge", "ge", "tekle", "timket", "x"):
+        assert [(e.title, e.kind, e.doc_idx, e.offset, e.count) for e in loaded.search(query)] == \
+               [(e.title, e.kind, e.doc_idx, e.offset, e.count) for e in built.search(query)]
+
+def test_changed_fingerprint_rebuilds(tmp_path):
+    bm25 = make_bm25()
+    build_autocomplete_index(bm25, index_dir=str(tmp_path), fingerprint="v1")
+    rebuilt = build_autocomplete_index(bm25, index_dir=str(tmp_path), fingerprint="v2")
+    assert isinstance(rebuilt.keys, list)
+    assert autocomplete_index.read_autocomplete_fingerprint(str(tmp_path)) == "v2"
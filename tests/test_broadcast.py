@@ -0,0 +1,191 @@
+import asyncio
+import pytest
+
+import httpx
+from telegram.error import Forbidden, TimedOut, NetworkError
+
+import broadcast
+from broadcast import Broadcaster, BroadcastJournal
+
+def timed_out(cause):
+    try:
+        raise TimedOut() from cause
+    except TimedOut as e:
+        return e
+
+class FakeBot:
+    """send_message raising the queued errors for a chat, then succeeding"""
+
+    def __init__(self, errors=None):
+        self.errors = {chat_id: list(errs) for chat_id, errs in (errors or {}).items()}
+        self.attempts = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.attempts.append(chat_id)
+        pending = self.errors.get(chat_id)
+        if pending:
+            raise pending.pop(0)
+
+async def pages(chunks):
+    for chunk in chunks:
+        yield chunk
+
+def broadcaster(bot, concurrency=4, **kwargs):
+    return Broadcaster(bot, concurrency=concurrency, rate=1000, per_chat_interval=0, **kwargs)
+
+def test_timeout_after_sending_is_not_resent():
+    bot = FakeBot({2: [timed_out(httpx.ReadTimeout("read"))], 3: [Forbidden("blocked")]})
+    results = {}
+    stats = asyncio.run(broadcaster(bot).send_all([1, 2, 3], "hi", on_result=results.__setitem__))
+    assert bot.attempts.count(2) == 1
+    assert results == {1: "sent", 2: "uncertain", 3: "blocked"}
+    assert stats.uncertain == [2] and stats.blocked == [3] and stats.sent == 1
+
+def test_request_that_never_left_is_retried():
+    connect_error = NetworkError("httpx.ConnectError")
+    connect_error.__cause__ = httpx.ConnectError("refused")
+    bot = FakeBot({1: [timed_out(httpx.ConnectTimeout("connect")), connect_error]})
+    stats = asyncio.run(broadcaster(bot, max_retries=3).send_all([1], "hi"))
+    assert bot.attempts == [1, 1, 1]
+    assert stats.sent == 1 and stats.retries == 2
+
+def test_retry_uncertain_opt_in():
+    bot = FakeBot({1: [timed_out(httpx.ReadTimeout("read"))]})
+    stats = asyncio.run(broadcaster(bot, retry_uncertain=True).send_all([1], "hi"))
+    assert bot.attempts == [1, 1]
+    assert stats.sent == 1
+
+def test_journal_resume_skips_chats_caught_mid_send(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+
+    async def interrupted():
+        journal = BroadcastJournal(path)
+        journal.begin("saint-2026-10-18", "hi", None)
+        await journal.mark_attempt(1)
+        journal.mark_result(1, "sent")
+        await journal.mark_attempt(2)  # Crash after sending to 2, before its result was recorded
+
+    asyncio.run(interrupted())
+    journal = BroadcastJournal(path)
+    assert journal.unfinished
+    assert journal.uncertain() == [2]
+    assert journal.states[1] == "sent"
+
+    async def resume():
+        bot = FakeBot()
+        await broadcaster(bot).send_all(journal.pending(pages([[1, 2, 3], [4, 5]])), journal.text,
+                                        on_attempt=journal.mark_attempt, on_result=journal.mark_result)
+        await journal.sync()
+        journal.complete("4/5 delivered")
+        await journal.aclose()
+        return bot
+
+    bot = asyncio.run(resume())
+    assert sorted(bot.attempts) == [3, 4, 5]
+    finished = BroadcastJournal(path)
+    assert finished.completed and not finished.unfinished
+    assert finished.broadcast_id == "saint-2026-10-18" and finished.summary == "4/5 delivered"
+
+def test_concurrent_attempts_share_fsyncs(tmp_path, monkeypatch):
+    fsyncs = []
+    real_fsync = broadcast.os.fsync
+    monkeypatch.setattr(broadcast.os, "fsync", lambda fd: (fsyncs.append(fd), real_fsync(fd)))
+    journal = BroadcastJournal(str(tmp_path / "journal.jsonl"))
+    journal.begin("b", "hi", None)
+    fsyncs.clear()
+
+    async def main():
+        await asyncio.gather(*(journal.mark_attempt(chat_id) for chat_id in range(50)))
+        await journal.aclose()
+
+    asyncio.run(main())
+    assert len(fsyncs) < 10
+    assert BroadcastJournal(journal.path).uncertain() == list(range(50))
+
+def test_failed_flush_keeps_records_for_the_next_sync(tmp_path, monkeypatch):
+    journal = BroadcastJournal(str(tmp_path / "journal.jsonl"))
+    journal.begin("b", "hi", None)
+    real_write = journal._write
+    failures = [OSError("disk full")]
+
+    def flaky_write(records):
+        if failures:
+            raise failures.pop()
+        real_write(records)
+    monkeypatch.setattr(journal, "_write", flaky_write)
+
+    async def main():
+        journal.mark_result(1, "sent")
+        with pytest.raises(OSError):
+            await journal.mark_attempt(2)  # The send must not go out
+        await journal.mark_attempt(3)
+        await journal.aclose()
+
+    asyncio.run(main())
+    assert BroadcastJournal(journal.path).states == {1: "sent", 2: "attempt", 3: "attempt"}
+
+def test_failed_fsync_leaves_no_torn_records(tmp_path, monkeypatch):
+    real_fsync = broadcast.os.fsync
+    failures = []
+
+    def flaky_fsync(fd):
+        if failures:
+            raise failures.pop()
+        real_fsync(fd)
+    monkeypatch.setattr(broadcast.os, "fsync", flaky_fsync)
+    journal = BroadcastJournal(str(tmp_path / "journal.jsonl"))
+    journal.begin("b", "hi", None)
+    failures.append(OSError("I/O error"))
+
+    async def main():
+        with pytest.raises(OSError):
+            await journal.mark_attempt(1)
+        await journal.mark_attempt(2)
+        await journal.aclose()
+
+    asyncio.run(main())
+    with open(journal.path, encoding='utf-8') as f:
+        assert len(f.readlines()) == 3  # Header, then each record once
+    assert BroadcastJournal(journal.path).states == {1: "attempt", 2: "attempt"}
+
+def test_recipients_are_streamed_page_by_page():
+    bot = FakeBot()
+    pulled = []  # Attempts made when each page was requested
+
+    async def subscriber_pages():
+        for start in range(0, 100, 10):
+            pulled.append(len(bot.attempts))
+            yield list(range(start, start + 10))
+
+    stats = asyncio.run(broadcaster(bot).send_all(subscriber_pages(), "hi"))
+    assert sorted(bot.attempts) == list(range(100))
+    assert stats.total == stats.sent == 100
+    # Concurrency 4 keeps at most 8 chat ids queued: later pages wait for sends
+    assert all(attempts >= page * 10 - 8 - 4 for page, attempts in enumerate(pulled))
+
+def test_run_broadcast_streams_subscribers_and_prunes_blocked(tmp_path, monkeypatch):
+    import telegram_bot
+    from subscriber_store import SubscriberStore
+
+    store = SubscriberStore(str(tmp_path / "subscribers.sqlite3"))
+    for chat_id in range(1, 2501):
+        store.subscribe(chat_id, None, None)
+    monkeypatch.setattr(telegram_bot, "subscriber_store", store)
+    monkeypatch.setattr(telegram_bot, "Broadcaster", lambda bot: broadcaster(bot, concurrency=20))
+    bot = FakeBot({7: [Forbidden("blocked")]})
+
+    async def main():
+        journal = BroadcastJournal(str(tmp_path / "journal.jsonl"))
+        journal.begin("saint-2026-10-18", "hi", None)
+        await journal.mark_attempt(1)  # Interrupted earlier right after sending to chat 1
+        try:
+            return await telegram_bot.run_broadcast(bot, journal)
+        finally:
+            await journal.aclose()
+
+    stats = asyncio.run(main())
+    assert 1 not in bot.attempts
+    assert sorted(bot.attempts) == list(range(2, 2501))
+    assert stats.blocked == [7] and 7 not in store
+    assert BroadcastJournal(str(tmp_path / "journal.jsonl")).summary == "2498/2500 delivered"
+    store.close()
@@ -0,0 +1,23 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from convert_pdfs import submit_window
+
+def test_submit_window_bounds_tasks_ahead_of_consumer():
+    submitted = []
+    lock = threading.Lock()
+
+    def task(n):
+        with lock:
+            submitted.append(n)
+        return [f"page {n}"]
+
+    consumed = 0
+    ahead = []
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for future in submit_window(pool, ((task, (n,)) for n in range(50)), window=8):
+            pool.submit(lambda: None).result()  # Let queued tasks run
+            assert future.result() == [f"page {consumed}"]
+            consumed += 1
+            ahead.append(len(submitted) - consumed)
+    assert consumed == 50
+    assert max(ahead) <= 7
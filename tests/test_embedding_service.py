@@ -0,0 +1,133 @@
+import time
+import socket
+import asyncio
+import numpy as np
+from collections import deque
+import embedding_service
+from embedding_service import (
+    EmbeddingDaemon, EmbeddingServiceClient, ServiceEmbeddings, encode_frame, recv_frame, read_frame,
+)
+
+class CountingEmbeddings:
+    """Vectors [len(text), n] with the call sizes recorded"""
+
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def embed_documents(self, texts):
+        time.sleep(self.delay)
+        self.calls.append(list(texts))
+        return [[float(len(text)), float(n)] for n, text in enumerate(texts)]
+
+def test_frames_round_trip_blocking_and_async():
+    header = {"op": "embed", "texts": ["ሰላም", "peace"]}
+    payload = np.arange(6, dtype="<f4").tobytes()
+    left, right = socket.socketpair()
+    with left, right:
+        left.sendall(encode_frame(header, payload) + encode_frame({"op": "info"}))
+        assert recv_frame(right) == (header, payload)
+        assert recv_frame(right) == ({"op": "info"}, b"")
+
+    async def read_async():
+        reader = asyncio.StreamReader()
+        reader.feed_data(encode_frame(header, payload))
+        reader.feed_eof()
+        return await read_frame(reader)
+
+    assert asyncio.run(read_async()) == (header, payload)
+
+def test_large_request_is_sliced_and_interleaved():
+    model = CountingEmbeddings(delay=0.01)
+    daemon = EmbeddingDaemon(model, "fake", max_batch=8, batch_wait=0.001)
+
+    async def scenario():
+        batcher = asyncio.create_task(daemon._batcher())
+        build = asyncio.create_task(daemon.embed([f"chunk {n}" for n in range(64)]))
+        await asyncio.sleep(0.015)  # The build is part-way through
+        query = await daemon.embed(["short question"])
+        assert not build.done()
+        vectors = await build
+        batcher.cancel()
+        return query, vectors
+
+    query, vectors = asyncio.run(scenario())
+    assert max(len(call) for call in model.calls) <= 8
+    assert query[0][0] == 14.0
+    assert [row[0] for row in vectors.tolist()] == [float(len(f"chunk {n}")) for n in range(64)]
+    assert daemon.batches == len(model.calls) == 9  # 64 + 1 texts, 8 per pass
+
+class FlakyClient:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    def embed(self, texts):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return [[1.0] for _ in texts]
+
+def test_timeout_is_retried_without_falling_back(monkeypatch):
+    monkeypatch.setattr(embedding_service, "get_embeddings", lambda *a, **kw: CountingEmbeddings())
+    client = FlakyClient([socket.timeout("timed out"), TimeoutError("timed out")])
+    embeddings = ServiceEmbeddings(client, "fake")
+    assert embeddings.embed_documents(["a"]) == [[1.0]]
+    assert client.calls == 3
+    assert embeddings._local_model is None
+
+def test_refused_connection_falls_back_to_local_model(monkeypatch):
+    monkeypatch.setattr(embedding_service, "get_embeddings", lambda *a, **kw: CountingEmbeddings())
+    client = FlakyClient([ConnectionRefusedError(), ConnectionRefusedError()])
+    embeddings = ServiceEmbeddings(client, "fake")
+    assert embeddings.embed_documents(["abc"]) == [[3.0, 0.0]]
+    assert embeddings._local_model is not None
+
+def test_daemon_serves_client_over_unix_socket(tmp_path):
+    path = str(tmp_path / "embed.sock")
+    daemon = EmbeddingDaemon(CountingEmbeddings(), "fake", path=path, max_batch=4, batch_wait=0.001)
+
+    async def scenario():
+        server = asyncio.create_task(daemon.serve())
+        while not daemon.started_at or not (tmp_path / "embed.sock").exists():
+            await asyncio.sleep(0.01)
+        client = EmbeddingServiceClient(path, timeout=5)
+        vectors = await asyncio.to_thread(client.embed, ["a", "bb", "ccc", "dddd", "eeeee"])
+        server.cancel()
+        return vectors
+
+    vectors = asyncio.run(scenario())
+    assert [row[0] for row in vectors] == [1.0, 2.0, 3.0, 4.0, 5.0]
+
+def test_served_by_daemon_sees_through_the_query_cache():
+    from embedding_backend import CachedQueryEmbeddings
+    service = ServiceEmbeddings(FlakyClient([]), "fake")
+    assert embedding_service.served_by_daemon(service)
+    assert embedding_service.served_by_daemon(CachedQueryEmbeddings(service))
+    assert not embedding_service.served_by_daemon(CachedQueryEmbeddings(CountingEmbeddings()))
+
+def test_daemon_drops_request_of_client_that_timed_out(tmp_path):
+    path = str(tmp_path / "embed.sock")
+    model = CountingEmbeddings(delay=0.05)
+    daemon = EmbeddingDaemon(model, "fake", path=path, max_batch=8, batch_wait=0.001)
+
+    async def scenario():
+        server = asyncio.create_task(daemon.serve())
+        while not (tmp_path / "embed.sock").exists():
+            await asyncio.sleep(0.01)
+        client = EmbeddingServiceClient(path, timeout=0.1)
+        try:
+            await asyncio.to_thread(client.embed, [f"chunk {n}" for n in range(200)])
+            raise AssertionError("expected a timeout")
+        except TimeoutError:
+            pass
+        await asyncio.sleep(0.2)
+        embedded = sum(len(call) for call in model.calls)
+        await asyncio.sleep(0.2)
+        server.cancel()
+        return embedded
+
+    embedded = asyncio.run(scenario())
+    assert daemon.jobs == deque()
+    assert embedded < 50  # Far short of the 200 texts the abandoned request asked for
+    assert sum(len(call) for call in model.calls) == embedded  # And nothing after the disconnect
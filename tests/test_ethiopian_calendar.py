@@ -0,0 +1,67 @@
+import json
+from datetime import date, timedelta
+import pytest
+from ethiopian_calendar import (
+    gregorian_to_ethiopian, ethiopian_to_gregorian, is_ethiopian_leap_year, format_ethiopian_date,
+    parse_heading, segment_synaxarium, load_or_build_synaxarium_index,
+)
+
+@pytest.mark.parametrize("gregorian, ethiopian", [
+    (date(2024, 9, 11), (2017, 1, 1)),    # Enkutatash
+    (date(2023, 9, 11), (2015, 13, 6)),   # Pagume 6 of a leap year
+    (date(2023, 9, 12), (2016, 1, 1)),
+    (date(2025, 1, 7), (2017, 4, 29)),    # Genna
+    (date(2025, 1, 19), (2017, 5, 11)),   # Timkat
+    (date(2026, 10, 18), (2019, 2, 8)),
+])
+def test_known_dates(gregorian, ethiopian):
+    assert gregorian_to_ethiopian(gregorian) == ethiopian
+    assert ethiopian_to_gregorian(*ethiopian) == gregorian
+
+def test_round_trip_and_pagume_length():
+    day = date(2019, 1, 1)
+    while day < date(2029, 1, 1):
+        year, month, ethiopian_day = gregorian_to_ethiopian(day)
+        assert ethiopian_to_gregorian(year, month, ethiopian_day) == day
+        if month == 13:
+            assert ethiopian_day <= (6 if is_ethiopian_leap_year(year) else 5)
+        day += timedelta(days=1)
+    assert format_ethiopian_date(2019, 2, 8) == "Tikimt 8, 2019 E.C."
+
+@pytest.mark.parametrize("line, expected", [
+    ("MESKEREM 1", (1, 1)),
+    ("## Meskerem 1st - St. John the Baptist", (1, 1)),
+    ("Tikimt 17:", (2, 17)),
+    ("**Hidar 3**", (3, 3)),
+    ("17th day of Tikimt", (2, 17)),
+    ("1 Meskerem", (1, 1)),
+    ("Pagume 6", (13, 6)),
+    ("Pagume 7", None),
+    ("Sane 5 people came to the church", None),
+    ("Meskerem 1 is the new year", None),
+    ("On Tir 11 we celebrate Timkat", None),
+])
+def test_parse_heading(line, expected):
+    assert parse_heading(line) == expected
+
+def test_segment_ignores_prose_dates():
+    text = "MESKEREM 1\nSt. John.\nSane 5 people came.\n\nTIKIMT 2\nAnother saint."
+    assert segment_synaxarium(text) == {
+        (1, 1): "MESKEREM 1\nSt. John.\nSane 5 people came.",
+        (2, 2): "TIKIMT 2\nAnother saint.",
+    }
+
+def test_index_from_older_parser_is_rebuilt(tmp_path):
+    source = tmp_path / "synaxarium.txt"
+    source.write_text("MESKEREM 1\nSt. John.\n", encoding="utf-8")
+    index_path = str(tmp_path / "index.json")
+    index = load_or_build_synaxarium_index([str(source)], index_path)
+    with open(index_path, encoding="utf-8") as f:
+        data = json.load(f)
+    data.pop("version")
+    data["entries"]["10-5"] = "Sane 5 people came."
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    rebuilt = load_or_build_synaxarium_index([str(source)], index_path)
+    assert rebuilt.lookup(10, 5) is None
+    assert rebuilt.entries == index.entries
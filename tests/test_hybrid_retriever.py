@@ -0,0 +1,49 @@
+from langchain_core.documents import Document
+from hybrid_retriever import BM25Index, HybridRetriever, is_keyword_query, tokenize
+
+TEXTS = [
+    "Tasbeha is the night praise of the Ethiopian Orthodox Church.",
+    "Saint George (Giyorgis) is commemorated on Miyazya 23.",
+    "Kidase is the Divine Liturgy, celebrated in Ge'ez.",
+    "Abune Tekle Haymanot founded Debre Libanos.",
+    "The Synaxarium lists the saints of every day of the year.",
+]
+
+class FakeVectorStore:
+    """Returns a fixed vector ranking and records whether it was asked"""
+
+    def __init__(self, ranking):
+        self.ranking = ranking
+        self.calls = []
+
+    def similarity_search(self, query, k=4, filter=None):
+        self.calls.append((query, k, filter))
+        return [Document(page_content=TEXTS[i], metadata={"source": "curriculum"}) for i in self.ranking[:k]]
+
+def make_bm25():
+    return BM25Index([f"doc#{n}" for n in range(len(TEXTS))], TEXTS, [{"source": "curriculum"} for _ in TEXTS])
+
+def test_bm25_ranks_exact_terms():
+    bm25 = make_bm25()
+    assert bm25.search("Giyorgis Miyazya", k=2)[0][0] == 1
+    assert bm25.search("unknownword") == []
+
+def test_keyword_query_skips_the_vector_store():
+    vectorstore = FakeVectorStore([4, 3, 2, 1, 0])
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=make_bm25(), k=1)
+    assert is_keyword_query(tokenize("Tasbeha"))
+    assert [doc.page_content for doc in retriever.search("Tasbeha")] == [TEXTS[0]]
+    assert vectorstore.calls == []
+
+def test_reciprocal_rank_fusion():
+    # Vector ranking: 4, 1, 2, 3, 0. Lexical hits: only doc 1 (Saint George).
+    vectorstore = FakeVectorStore([4, 1, 2, 3, 0])
+    retriever = HybridRetriever(vectorstore=vectorstore, bm25=make_bm25(), k=3, rrf_k=60)
+    docs = retriever.search("tell me about george")
+    # Doc 1: 1/62 + 1/61 beats doc 4's 1/61 alone; the rest keep vector order
+    assert [doc.page_content for doc in docs] == [TEXTS[1], TEXTS[4], TEXTS[2]]
+    assert vectorstore.calls == [("tell me about george", 10, None)]
+    # A lexical-only hit enters the fused list with its BM25 document (and id)
+    lexical_only = HybridRetriever(vectorstore=FakeVectorStore([4]), bm25=make_bm25(), k=2).search("tell me about kidase")
+    assert [doc.page_content for doc in lexical_only] == [TEXTS[4], TEXTS[2]]  # Tied at 1/61: vector first
+    assert lexical_only[1].id == "doc#2"
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from inline_search import InlineSearchScheduler
+
+class RecordingSearch:
+    """search_fn stand-in recording every query that reached the retriever"""
+
+    def __init__(self):
+        self.queries = []
+        self._lock = threading.Lock()
+
+    def __call__(self, query):
+        with self._lock:
+            self.queries.append(query)
+        return [f"doc for {query}"]
+
+def test_rapid_keystrokes_only_search_the_last_query():
+    search = RecordingSearch()
+    scheduler = InlineSearchScheduler(search, workers=1, debounce=0.05)
+    answered = []
+
+    async def on_results(docs, search_seconds):
+        answered.append(docs)
+
+    async def main():
+        tasks = []
+        for query in ("s", "sa", "sai", "saint", "saint ge"):
+            tasks.append(scheduler.submit(42, query, on_results))
+            await asyncio.sleep(0.005)  # Faster than the debounce
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return tasks
+
+    try:
+        tasks = asyncio.run(main())
+    finally:
+        scheduler.executor.shutdown(wait=True)
+    assert all(task.cancelled() for task in tasks[:-1])
+    assert not tasks[-1].cancelled()
+    assert search.queries == ["saint ge"]
+    assert answered == [["doc for saint ge"]]
+    assert scheduler.stats() == {"users": 1, "submitted": 5, "superseded": 4, "completed": 1}
+
+def test_users_do_not_cancel_each_other():
+    search = RecordingSearch()
+    scheduler = InlineSearchScheduler(search, workers=2, debounce=0.02)
+
+    async def on_results(docs, search_seconds):
+        pass
+
+    async def main():
+        await asyncio.gather(scheduler.submit(1, "kidase", on_results), scheduler.submit(2, "tasbeha", on_results))
+
+    try:
+        asyncio.run(main())
+    finally:
+        scheduler.executor.shutdown(wait=True)
+    assert sorted(search.queries) == ["kidase", "tasbeha"]
+
+def test_state_table_is_bounded_by_size_and_ttl():
+    search = RecordingSearch()
+    scheduler = InlineSearchScheduler(search, workers=1, debounce=10, max_users=3, ttl=0.05)
+
+    async def on_results(docs, search_seconds):
+        pass
+
+    async def main():
+        tasks = [scheduler.submit(user_id, "saint", on_results) for user_id in range(10)]
+        assert len(scheduler) == 3
+        assert all(task.cancelled() or task.cancelling() for task in tasks[:7])  # Evicted users' searches stop
+        await asyncio.sleep(0.1)
+        tasks.append(scheduler.submit(99, "saint", on_results))
+        assert len(scheduler) == 1  # The other users' entries expired
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    try:
+        asyncio.run(main())
+    finally:
+        scheduler.executor.shutdown(wait=True)
+    assert search.queries == []
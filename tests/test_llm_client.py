@@ -0,0 +1,113 @@
+import json
+import asyncio
+import httpx
+import pytest
+from langchain_core.messages import HumanMessage
+from llm_client import AsyncLLM
+
+MESSAGES = [HumanMessage(content="Who is Saint George?")]
+
+def completion(content):
+    return httpx.Response(200, json={
+        "id": "test", "object": "chat.completion", "created": 0, "model": "deepseek-chat",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    })
+
+def stream_event(content):
+    chunk = {
+        "id": "test", "object": "chat.completion.chunk", "created": 0, "model": "deepseek-chat",
+        "choices": [{"index": 0, "delta": {"content": content}, "finish_reason": None}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n".encode()
+
+def make_llm(handler, **kwargs):
+    return AsyncLLM("test-key", transport=httpx.MockTransport(handler), **kwargs)
+
+def test_ainvoke_never_exceeds_max_in_flight():
+    async def main():
+        active = 0
+        peak = 0
+
+        async def handler(request):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.02)
+            active -= 1
+            return completion("Giyorgis")
+
+        llm = make_llm(handler, max_in_flight=2)
+        try:
+            results = await asyncio.gather(*(llm.ainvoke(MESSAGES) for _ in range(6)))
+        finally:
+            await llm.aclose()
+        return peak, results, llm.stats()
+
+    peak, results, stats = asyncio.run(main())
+    assert peak == 2
+    assert [result.content for result in results] == ["Giyorgis"] * 6
+    assert stats["requests"] == 6 and stats["in_flight"] == 0 and stats["waiting"] == 0
+
+def test_ainvoke_timeout_counts_and_frees_the_slot():
+    async def main():
+        slow = True
+
+        async def handler(request):
+            if slow:
+                await asyncio.sleep(5)
+            return completion("late")
+
+        llm = make_llm(handler, max_in_flight=1, timeout=0.05)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await llm.ainvoke(MESSAGES)
+            slow = False
+            answer = await llm.ainvoke(MESSAGES)  # Would hang if the slot leaked
+        finally:
+            await llm.aclose()
+        return answer, llm.stats()
+
+    answer, stats = asyncio.run(main())
+    assert answer.content == "late"
+    assert stats["timeouts"] == 1 and stats["in_flight"] == 0
+
+def test_astream_yields_pieces_in_order():
+    async def handler(request):
+        body = b"".join(stream_event(piece) for piece in ("Saint ", "George ", "of Lydda")) + b"data: [DONE]\n\n"
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body)
+
+    async def main():
+        llm = make_llm(handler)
+        try:
+            pieces = [piece async for piece in llm.astream(MESSAGES)]
+        finally:
+            await llm.aclose()
+        return pieces, llm.stats()
+
+    pieces, stats = asyncio.run(main())
+    assert "".join(pieces) == "Saint George of Lydda"
+    assert stats["in_flight"] == 0
+
+def test_abandoned_astream_frees_its_slot_on_aclose():
+    async def handler(request):
+        async def body():
+            yield stream_event("Saint ")
+            await asyncio.sleep(5)  # The rest never arrives in time
+            yield b"data: [DONE]\n\n"
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, content=body())
+
+    async def main():
+        llm = make_llm(handler, max_in_flight=1)
+        try:
+            stream = llm.astream(MESSAGES)
+            assert await stream.__anext__() == "Saint "
+            assert llm.in_flight == 1
+            await stream.aclose()
+            in_flight = llm.in_flight
+            await asyncio.wait_for(llm._acquire(), timeout=1)  # The slot is free again
+        finally:
+            await llm.aclose()
+        return in_flight
+
+    assert asyncio.run(main()) == 0
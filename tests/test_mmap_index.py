@@ -0,0 +1,25 @@
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import Chroma
+from mmap_index import chroma_fingerprint
+from telegram_bot import close_chroma_clients
+
+def test_fingerprint_tracks_writes_not_opens(tmp_path):
+    embeddings = DeterministicFakeEmbedding(size=8)
+    db_path = str(tmp_path / "chroma")
+    store = Chroma(persist_directory=db_path, embedding_function=embeddings)
+    try:
+        store.add_texts(["Meskerem 1", "Tikimt 2"], ids=["a#0", "a#1"])
+        before = chroma_fingerprint(store, db_path)
+        close_chroma_clients()
+
+        # Reopening and reading rewrites chroma.sqlite3 but is not a change
+        store = Chroma(persist_directory=db_path, embedding_function=embeddings)
+        store.similarity_search("Meskerem", k=1)
+        assert chroma_fingerprint(store, db_path) == before
+
+        # Same chunk count, no manifest: only the write position shows the update
+        store.add_texts(["Tikimt 2, revised"], ids=["a#1"])
+        assert store._collection.count() == 2
+        assert chroma_fingerprint(store, db_path) != before
+    finally:
+        close_chroma_clients()
@@ -0,0 +1,48 @@
+import os
+import json
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from mmap_index import export_chroma, chroma_fingerprint
+from pq_index import build_quantized_index, QuantizedVectorStore, recall_report
+from telegram_bot import close_chroma_clients
+
+class NormalizedFakeEmbedding(DeterministicFakeEmbedding):
+    """Unit vectors, like the real models, so Chroma's L2 and the index's cosine rank alike"""
+
+    def _get_embedding(self, seed):
+        vector = np.asarray(super()._get_embedding(seed))
+        return list(vector / np.linalg.norm(vector))
+
+def test_recall_report_against_chroma_retriever(tmp_path):
+    embeddings = NormalizedFakeEmbedding(size=64)
+    db_path = str(tmp_path / "chroma")
+    index_dir = str(tmp_path / "index")
+    texts = [f"Verse {n} of the book of Psalms, chapter {n % 150}" for n in range(200)]
+    chroma_store = Chroma.from_documents(
+        [Document(page_content=text, metadata={"source": f"psalms.md#{n}"}) for n, text in enumerate(texts)],
+        embeddings, persist_directory=db_path,
+    )
+    try:
+        export_chroma(chroma_store, index_dir, fingerprint=chroma_fingerprint(chroma_store, db_path))
+        build_quantized_index(index_dir, "sq8")
+        store = QuantizedVectorStore(index_dir, embedding_function=embeddings, mode="sq8")
+
+        # Queries that are chunk texts have that chunk as Chroma's top hit
+        approx_recall, rerank_recall = recall_report(chroma_store, store, texts[:20])
+        assert rerank_recall == 1.0
+        assert 0.5 < approx_recall <= 1.0
+        assert store.resident_bytes() < store.matrix.nbytes
+        assert sorted(os.listdir(index_dir)) == [
+            "embeddings.npy", "meta.json", "offsets.npy", "sq8_codes.npy", "sq8_meta.json", "sq8_params.npy", "texts.bin",
+        ]  # No float32 copy next to the export
+    finally:
+        close_chroma_clients()
+
+def test_empty_export_is_a_clear_error(tmp_path):
+    with open(tmp_path / "meta.json", "w", encoding="utf-8") as f:
+        json.dump({"ids": [], "metadatas": [], "fingerprint": None}, f)
+    with pytest.raises(ValueError, match="empty"):
+        build_quantized_index(str(tmp_path), "pq")
@@ -0,0 +1,57 @@
+import asyncio
+from datetime import date, timedelta
+from saint_summary_cache import SaintSummaryCache
+
+def test_single_flight_survives_cancelled_generator(tmp_path):
+    cache = SaintSummaryCache(str(tmp_path / "summaries.json"))
+    day = date.today()
+    calls = []
+
+    async def generate(day):
+        calls.append(day)
+        await asyncio.sleep(0.05)
+        return "Tikimt 8", f"summary {len(calls)}"
+
+    async def scenario():
+        first = asyncio.create_task(cache.get_or_generate(day, generate))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cache.get_or_generate(day, generate)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        first.cancel()
+        results = await asyncio.wait_for(asyncio.gather(*waiters), 1.0)
+        return first, results
+
+    first, results = asyncio.run(scenario())
+    assert first.cancelled()
+    # One waiter took over the generation; the others shared its result
+    assert results == [("Tikimt 8", "summary 2")] * 3
+    assert len(calls) == 2
+    assert cache.get(day) == ("Tikimt 8", "summary 2")
+    assert cache._inflight == {}
+
+def test_workers_sharing_the_file_generate_each_day_once(tmp_path):
+    path = str(tmp_path / "summaries.json")
+    workers = [SaintSummaryCache(path), SaintSummaryCache(path)]  # Loaded before either generates, like forked workers
+    today = date.today()
+    tomorrow = today + timedelta(days=1)
+    calls = []
+
+    async def generate(day):
+        calls.append(day)
+        await asyncio.sleep(0.05)
+        return day.isoformat(), f"summary of {day.isoformat()}"
+
+    async def scenario():
+        return await asyncio.gather(*(worker.get_or_generate(today, generate) for worker in workers))
+
+    results = asyncio.run(scenario())
+    assert calls == [today]
+    assert results[0] == results[1] == (today.isoformat(), f"summary of {today.isoformat()}")
+
+    # Each worker's write merges into the file instead of replacing the other's entries
+    asyncio.run(workers[1].get_or_generate(tomorrow, generate))
+    assert SaintSummaryCache(path).get(today) is not None
+    assert SaintSummaryCache(path).get(tomorrow) is not None
+    assert workers[0].get(tomorrow) is None  # Until it misses and re-reads the file
+    assert asyncio.run(workers[0].get_or_generate(tomorrow, generate))[0] == tomorrow.isoformat()
+    assert calls == [today, tomorrow]
@@ -0,0 +1,52 @@
+import os
+from langchain_core.documents import Document
+from source_manifest import SourceManifest, assign_chunk_ids
+
+def write(path, text, mtime=None):
+    path.write_text(text, encoding="utf-8")
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+def test_manifest_detects_added_changed_touched_and_deleted_files(tmp_path):
+    sources = tmp_path / "sources"
+    sources.mkdir()
+    write(sources / "a.txt", "Meskerem 1", mtime=1_700_000_000)
+    write(sources / "b.txt", "Tikimt 2", mtime=1_700_000_000)
+    manifest_path = str(tmp_path / "db" / "source_manifest.json")
+
+    manifest = SourceManifest(manifest_path)
+    assert not manifest.exists
+    assert manifest.is_changed("a.txt", sources / "a.txt")
+    manifest.record("a.txt", sources / "a.txt", ids=["a.txt#0"])
+    manifest.record("b.txt", sources / "b.txt", ids=["b.txt#0"])
+    manifest.save()
+
+    reloaded = SourceManifest(manifest_path)
+    assert reloaded.exists and reloaded.names() == {"a.txt", "b.txt"}
+    assert reloaded.get("a.txt")["ids"] == ["a.txt#0"]
+
+    # Touched but identical: not a change, and the new mtime is remembered
+    write(sources / "a.txt", "Meskerem 1", mtime=1_800_000_000)
+    assert not reloaded.is_changed("a.txt", sources / "a.txt")
+    assert reloaded.get("a.txt")["mtime"] == 1_800_000_000
+    # Same size, different bytes
+    write(sources / "b.txt", "Tikimt 3", mtime=1_800_000_000)
+    assert reloaded.is_changed("b.txt", sources / "b.txt")
+    # Deleted and added files are the set differences of names
+    os.remove(sources / "b.txt")
+    write(sources / "c.txt", "Hidar 3")
+    current = {path.name for path in sources.iterdir()}
+    assert sorted(reloaded.names() - current) == ["b.txt"]
+    assert sorted(current - reloaded.names()) == ["c.txt"]
+
+def test_manifest_from_other_version_starts_empty(tmp_path):
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text('{"version": 0, "files": {"a.txt": {}}}', encoding="utf-8")
+    assert SourceManifest(str(manifest_path)).names() == set()
+    manifest_path.write_text("{not json", encoding="utf-8")
+    manifest = SourceManifest(str(manifest_path))
+    assert not manifest.exists and manifest.names() == set()
+
+def test_chunk_ids_count_per_file():
+    splits = [Document(page_content=str(n), metadata={"filename": name}) for n, name in enumerate(["a.md", "b.txt", "a.md", "a.md"])]
+    assert assign_chunk_ids(splits) == ["a.md#0", "b.txt#0", "a.md#1", "a.md#2"]
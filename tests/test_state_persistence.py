@@ -0,0 +1,47 @@
+import asyncio
+import sqlite3
+from state_persistence import SQLitePersistence
+
+def test_refresh_picks_up_other_process_writes(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+
+    async def scenario():
+        worker_a, worker_b = SQLitePersistence(path), SQLitePersistence(path)
+        user_data_b = {}
+        await worker_b.refresh_user_data(7, user_data_b)
+        assert user_data_b == {}
+
+        for turn in range(1, 4):
+            await worker_a.update_user_data(7, {"conversation_history": ["q"] * turn})
+            await worker_a.flush()
+            await worker_b.refresh_user_data(7, user_data_b)
+            assert user_data_b == {"conversation_history": ["q"] * turn}
+
+        # Versions count writes; nothing new means no change to the in-memory copy
+        assert worker_a._versions[("user", 7)] == worker_b._versions[("user", 7)] == 3
+        user_data_b["local"] = True
+        await worker_b.refresh_user_data(7, user_data_b)
+        assert user_data_b["local"] is True
+
+        await worker_b.update_conversation("quiz", (7, 7), 2)
+        assert await worker_a.get_conversations("quiz") == {(7, 7): 2}
+
+    asyncio.run(scenario())
+
+def test_adds_version_column_to_existing_database(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    db = sqlite3.connect(path)
+    db.execute("""CREATE TABLE state (kind TEXT NOT NULL, key INTEGER NOT NULL, data BLOB NOT NULL,
+        updated_at REAL NOT NULL, PRIMARY KEY (kind, key)) WITHOUT ROWID""")
+    db.execute("INSERT INTO state VALUES ('user', 1, ?, 1700000000.0)", (b'j{"a":1}',))
+    db.commit()
+    db.close()
+
+    async def scenario():
+        persistence = SQLitePersistence(path)
+        assert (await persistence.get_user_data()) == {1: {"a": 1}}
+        await persistence.update_user_data(1, {"a": 2})
+        await persistence.flush()
+        assert persistence._versions[("user", 1)] == 1
+
+    asyncio.run(scenario())
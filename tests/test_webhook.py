@@ -0,0 +1,95 @@
+import socket
+import asyncio
+
+import httpx
+
+import telegram_bot
+from fake_bot_api import FakeBotAPI
+from state_persistence import SQLitePersistence
+from subscriber_store import SubscriberStore
+
+SECRET = "s3cret"
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_update(update_id, chat_id):
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Abebe", "language_code": "am"},
+            "text": "/start",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 6}],
+        },
+    }
+
+def test_webhook_update_is_answered_through_fake_bot_api(tmp_path, monkeypatch):
+    store = SubscriberStore(str(tmp_path / "subscribers.sqlite3"))
+    monkeypatch.setattr(telegram_bot, "subscriber_store", store)
+    monkeypatch.setattr(telegram_bot, "TOKEN", "123:abc")
+    monkeypatch.setattr(telegram_bot, "SQLitePersistence", lambda: SQLitePersistence(str(tmp_path / "state.sqlite3")))
+    port = free_port()
+
+    async def main():
+        async with FakeBotAPI() as api:
+            monkeypatch.setattr(telegram_bot, "TELEGRAM_API_BASE_URL", api.base_url)
+            app = telegram_bot.build_application(run_jobs=False)
+            async with app:
+                await app.updater.start_webhook(
+                    listen="127.0.0.1",
+                    port=port,
+                    url_path="telegram",
+                    webhook_url="https://bot.example.org/telegram",
+                    secret_token=SECRET,
+                )
+                await app.start()
+                try:
+                    url = f"http://127.0.0.1:{port}/telegram"
+                    async with httpx.AsyncClient() as client:
+                        rejected = await client.post(url, json=start_update(1, 42), headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+                        first = await client.post(url, json=start_update(2, 42), headers={"X-Telegram-Bot-Api-Secret-Token": SECRET})
+                        second = await client.post(url, json=start_update(3, 43), headers={"X-Telegram-Bot-Api-Secret-Token": SECRET})
+                    replies = await api.wait_for("sendMessage", count=2)
+                finally:
+                    await app.updater.stop()
+                    await app.stop()
+            return api, rejected, first, second, replies
+
+    api, rejected, first, second, replies = asyncio.run(main())
+    assert rejected.status_code == 403
+    assert first.status_code == second.status_code == 200
+    assert api.webhook_url == "https://bot.example.org/telegram"
+    assert sorted(int(reply["chat_id"]) for reply in replies) == [42, 43]
+    assert all(reply["text"].startswith("Hey Abebe!") for reply in replies)
+    assert 42 in store and 43 in store
+    store.close()
+
+def test_polling_update_is_answered_through_fake_bot_api(tmp_path, monkeypatch):
+    store = SubscriberStore(str(tmp_path / "subscribers.sqlite3"))
+    monkeypatch.setattr(telegram_bot, "subscriber_store", store)
+    monkeypatch.setattr(telegram_bot, "TOKEN", "123:abc")
+    monkeypatch.setattr(telegram_bot, "SQLitePersistence", lambda: SQLitePersistence(str(tmp_path / "state.sqlite3")))
+
+    async def main():
+        async with FakeBotAPI() as api:
+            monkeypatch.setattr(telegram_bot, "TELEGRAM_API_BASE_URL", api.base_url)
+            api.push_update(start_update(1, 42))  # Queued before the bot starts: must not be dropped
+            app = telegram_bot.build_application(run_jobs=False)
+            async with app:
+                await app.updater.start_polling(poll_interval=0, timeout=1, drop_pending_updates=False)
+                await app.start()
+                try:
+                    replies = await api.wait_for("sendMessage")
+                finally:
+                    await app.updater.stop()
+                    await app.stop()
+            return replies
+
+    replies = asyncio.run(main())
+    assert int(replies[0]["chat_id"]) == 42
+    store.close()
@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import asyncio
+from multiprocessing import Pipe
+
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+
+from fake_bot_api import FakeBotAPI
+from worker_pool import ChatOrderedUpdateProcessor, WorkerPool, chat_key, serve_worker
+
+def make_update(update_id, chat_id):
+    return Update.de_json({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "T"},
+            "text": f"message {update_id}",
+        },
+    }, None)
+
+def test_chat_key_prefers_chat_then_user():
+    assert chat_key(make_update(1, 42)) == 42
+    inline = Update.de_json({
+        "update_id": 7,
+        "inline_query": {"id": "q", "from": {"id": 99, "is_bot": False, "first_name": "T"}, "query": "x", "offset": ""},
+    }, None)
+    assert chat_key(inline) == 99
+
+async def _run(processor, updates, durations):
+    """Process updates as PTB does (one task each, in arrival order); returns (event, update_id) log"""
+    log = []
+
+    async def handle(update):
+        log.append(("start", update.update_id))
+        await asyncio.sleep(durations.get(update.update_id, 0.01))
+        log.append(("end", update.update_id))
+
+    tasks = [asyncio.create_task(processor.process_update(u, handle(u))) for u in updates]
+    await asyncio.gather(*tasks)
+    return log
+
+def test_updates_of_one_chat_run_in_order():
+    processor = ChatOrderedUpdateProcessor(4)
+    updates = [make_update(i, 42) for i in range(5)]
+    log = asyncio.run(_run(processor, updates, {0: 0.05, 1: 0.01, 2: 0.03}))
+    assert log == [(event, i) for i in range(5) for event in ("start", "end")]
+    assert processor._chat_locks == {}
+
+def test_busy_chat_does_not_block_other_chats():
+    # Two slots; chat 1 floods the queue with slow updates, then chat 2 sends one
+    processor = ChatOrderedUpdateProcessor(2)
+    updates = [make_update(i, 1) for i in range(4)] + [make_update(9, 2)]
+    log = asyncio.run(_run(processor, updates, {i: 0.1 for i in range(4)}))
+    starts = [i for event, i in log if event == "start"]
+    # Chat 2 starts while chat 1's first update is still running, not after its backlog
+    assert starts.index(9) == 1
+    assert log.index(("start", 9)) < log.index(("end", 0))
+
+def test_concurrency_limit_holds_across_chats():
+    processor = ChatOrderedUpdateProcessor(2)
+    running = peak = 0
+
+    async def main():
+        nonlocal running, peak
+
+        async def handle():
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.02)
+            running -= 1
+
+        await asyncio.gather(*(processor.process_update(make_update(i, i), handle()) for i in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+
+def test_chroma_clients_are_closed_before_fork(tmp_path):
+    from langchain_core.embeddings import Embeddings
+    from langchain_community.vectorstores import Chroma
+    import telegram_bot
+
+    class FixedEmbeddings(Embeddings):
+        def embed_documents(self, texts):
+            return [[1.0, 0.0, 0.0] for _ in texts]
+
+        def embed_query(self, text):
+            return [1.0, 0.0, 0.0]
+
+    store = Chroma(persist_directory=str(tmp_path), embedding_function=FixedEmbeddings())
+    store.add_texts(["Saint George", "Abba Samuel"])
+    assert store._collection.count() == 2
+
+    def open_files():
+        paths = []
+        for fd in os.listdir("/proc/self/fd"):
+            try:
+                paths.append(os.readlink(f"/proc/self/fd/{fd}"))
+            except OSError:
+                pass
+        return [path for path in paths if path.startswith(str(tmp_path))]
+
+    assert open_files()
+    assert telegram_bot.close_chroma_clients() >= 1
+    assert open_files() == []
+
+def _record_worker(out_dir):
+    """run_worker for WorkerPool: log received update ids until the supervisor closes the pipe"""
+    def run_worker(index, reader):
+        received = []
+        while True:
+            try:
+                payload = reader.recv_bytes()
+            except EOFError:
+                break
+            update = json.loads(payload)
+            received.append([update["message"]["chat"]["id"], update["update_id"]])
+        with open(f"{out_dir}/worker{index}.json", "w") as f:
+            json.dump(received, f)
+
+    return run_worker
+
+def test_forward_routes_chats_to_fixed_workers_and_stops_on_pipe_close(tmp_path):
+    pool = WorkerPool(3, _record_worker(tmp_path))
+    pool.start()
+    pids = [pid for pid, _ in pool.workers]
+    chats = [10, 11, 12, 13, 10, 11, 10, 14, 13, 10]
+    updates = [make_update(update_id, chat_id) for update_id, chat_id in enumerate(chats)]
+
+    async def forward_all():
+        for update in updates:
+            await pool.forward(update)
+
+    asyncio.run(forward_all())
+    started = time.monotonic()
+    pool.stop()  # Closing the pipes is the only stop signal the workers get
+    assert time.monotonic() - started < 5
+    for pid in pids:
+        try:
+            os.waitpid(pid, os.WNOHANG)
+            raise AssertionError(f"worker {pid} was not reaped")
+        except ChildProcessError:
+            pass
+
+    for index in range(3):
+        with open(tmp_path / f"worker{index}.json") as f:
+            received = json.load(f)
+        assert all(chat_id % 3 == index for chat_id, _ in received)
+        # Arrival order is kept within the worker (and so within each chat)
+        assert received == [[chat_id, update_id] for update_id, chat_id in enumerate(chats) if chat_id % 3 == index]
+    assert pool.forwarded == [sum(1 for chat_id in chats if chat_id % 3 == index) for index in range(3)]
+
+def test_serve_worker_drains_and_stops_when_pipe_closes():
+    async def scenario():
+        async with FakeBotAPI() as api:
+            handled = []
+
+            async def record(update, context):
+                await asyncio.sleep(0.01)
+                handled.append((update.effective_chat.id, update.update_id))
+
+            app = (
+                Application.builder().token("123:abc").base_url(api.base_url).updater(None)
+                .concurrent_updates(ChatOrderedUpdateProcessor(4)).build()
+            )
+            app.add_handler(TypeHandler(Update, record))
+            reader, writer = Pipe(duplex=False)
+            for update_id, chat_id in enumerate([5, 6, 5, 5, 6]):
+                writer.send_bytes(json.dumps(make_update(update_id, chat_id).to_dict()).encode())
+            writer.close()
+            await asyncio.wait_for(serve_worker(app, reader), 10)
+            return handled
+
+    handled = asyncio.run(scenario())
+    assert sorted(handled) == [(5, 0), (5, 2), (5, 3), (6, 1), (6, 4)]
+    assert [update_id for chat_id, update_id in handled if chat_id == 5] == [0, 2, 3]
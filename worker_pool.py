@@ -0,0 +1,164 @@
+"""
+Supervisor mode: one preloaded index, N forked bot workers
+
+With BOT_WORKERS > 1 the bot process runs setup() once (embedding model,
+read-only mmap/quantized index, BM25 and autocomplete tables), then forks
+the workers. Each child starts with the parent's memory mapped copy-on-write,
+so the model weights and index pages are shared instead of loaded N times.
+
+The supervisor keeps the Telegram connection (polling or webhook) and only
+forwards each update, as JSON over a pipe, to worker chat_key(update) %
+BOT_WORKERS. Every chat always lands on the same worker, and within a
+worker ChatOrderedUpdateProcessor runs a chat's updates one after another,
+so per-chat ordering holds while different chats run in parallel across
+processes. Worker 0 also runs the scheduled jobs.
+
+Nothing that owns a thread or a database handle may be live at fork time:
+the supervisor needs VECTOR_ENGINE=mmap, pq or sq8, closes every Chroma
+client setup() opened before forking, and builds the embedding model
+single-threaded (torch and onnxruntime are only fork-safe without their
+intra-op thread pools). Each worker reopens its own SQLite stores.
+"""
+
+import os
+import json
+import time
+import signal
+import asyncio
+from multiprocessing import Pipe
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "0"))  # 0/1 = single process
+WORKER_STOP_TIMEOUT = 30.0
+
+def chat_key(update):
+    """Routing / ordering key: the chat, else the user (inline queries), else the update"""
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return update.update_id
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Up to max_concurrent_updates at once, but never two of the same chat.
+
+    An update first waits for its chat's turn and only then takes one of the
+    max_concurrent_updates slots, so a chat with a backlog of queued
+    messages holds at most one slot and never delays other chats.
+    (PTB's process_update takes the slot first; it is overridden here to
+    swap that order.)
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._chat_locks = {}  # chat key -> [asyncio.Lock, updates holding or waiting]
+
+    async def process_update(self, update, coroutine):
+        if not isinstance(update, Update):
+            async with self._semaphore:
+                await self.do_process_update(update, coroutine)
+            return
+        key = chat_key(update)
+        entry = self._chat_locks.get(key)
+        if entry is None:
+            entry = self._chat_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                async with self._semaphore:
+                    await self.do_process_update(update, coroutine)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chat_locks[key]
+
+    async def do_process_update(self, update, coroutine):
+        await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+class WorkerPool:
+    """Forked worker processes, each fed updates through its own pipe"""
+
+    def __init__(self, n_workers, run_worker):
+        self.n_workers = n_workers
+        self.run_worker = run_worker  # run_worker(index, connection), runs in the child
+        self.workers = []  # (pid, writer connection) per worker index
+        self.forwarded = [0] * n_workers
+
+    def start(self):
+        """Fork every worker; call before the supervisor starts its event loop"""
+        for index in range(self.n_workers):
+            reader, writer = Pipe(duplex=False)
+            pid = os.fork()
+            if pid == 0:
+                # Child: stopping is driven by the supervisor closing the pipe
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                signal.signal(signal.SIGTERM, signal.SIG_IGN)
+                writer.close()
+                for _, other in self.workers:
+                    other.close()
+                exit_code = 0
+                try:
+                    self.run_worker(index, reader)
+                except BaseException as e:
+                    print(f"❌ Worker {index} crashed: {e}", flush=True)
+                    import traceback
+                    traceback.print_exc()
+                    exit_code = 1
+                finally:
+                    os._exit(exit_code)
+            reader.close()
+            self.workers.append((pid, writer))
+            print(f"   👷 Worker {index} started (pid {pid})", flush=True)
+
+    async def forward(self, update, context=None):
+        """Send an update to its chat's worker, preserving arrival order"""
+        index = chat_key(update) % self.n_workers
+        pid, writer = self.workers[index]
+        payload = json.dumps(update.to_dict()).encode("utf-8")
+        try:
+            await asyncio.to_thread(writer.send_bytes, payload)
+        except OSError as e:
+            # A dead worker would silently lose its chats: stop so the platform restarts everything
+            print(f"❌ Worker {index} (pid {pid}) is gone ({e}) - shutting down supervisor", flush=True)
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+        self.forwarded[index] += 1
+
+    def stop(self):
+        """Close the pipes (workers finish and flush state), then reap them"""
+        for _, writer in self.workers:
+            writer.close()
+        deadline = time.monotonic() + WORKER_STOP_TIMEOUT
+        for index, (pid, _) in enumerate(self.workers):
+            try:
+                while os.waitpid(pid, os.WNOHANG) == (0, 0):
+                    if time.monotonic() > deadline:
+                        print(f"⚠️ Worker {index} (pid {pid}) did not stop in time - killing it", flush=True)
+                        os.kill(pid, signal.SIGKILL)
+                        os.waitpid(pid, 0)
+                        break
+                    time.sleep(0.1)
+            except ChildProcessError:
+                pass
+        print(f"   👷 Workers stopped (updates forwarded: {self.forwarded})", flush=True)
+
+async def serve_worker(app, reader):
+    """Feed updates from the supervisor's pipe into a worker Application until it closes"""
+    loop = asyncio.get_running_loop()
+    async with app:
+        await app.start()
+        while True:
+            try:
+                payload = await loop.run_in_executor(None, reader.recv_bytes)
+            except (EOFError, OSError):
+                break
+            await app.update_queue.put(Update.de_json(json.loads(payload), app.bot))
+        await app.stop()